@@ -4,13 +4,13 @@ from opentrons import types
 metadata = {
     'protocolName': 'Automated Supplemental Protocol - Basic Aliquoting with Magnetic Bead Cleanup',
     'author': 'OpentronsAI, Updated by ChatGPT',
-    'description': 'Automated protocol with magnetic bead mixing before each aspirate step.',
+    'description': 'Automated protocol with magnetic beads resuspended on the heater-shaker before they are distributed.',
     'source': 'OpentronsAI'
 }
 
 requirements = {
     'robotType': 'Flex',
-    'apiLevel': '2.19'
+    'apiLevel': '2.27'
 }
 
 def add_parameters(parameters):
@@ -49,11 +49,13 @@ def run(protocol: protocol_api.ProtocolContext):
     pip1000 = protocol.load_instrument("flex_8channel_1000", "right")
 
     # FLOW RATES
-    pip50.flow_rate.aspirate = 20
-    pip50.flow_rate.dispense = 20
+    # Both pipettes stay at the mixing speed; slower moves scale it down with rate=
+    MIX_FLOW = 500
+    pip50.flow_rate.aspirate = MIX_FLOW
+    pip50.flow_rate.dispense = MIX_FLOW
     pip50.flow_rate.blow_out = 50
-    pip1000.flow_rate.aspirate = 50
-    pip1000.flow_rate.dispense = 150
+    pip1000.flow_rate.aspirate = MIX_FLOW
+    pip1000.flow_rate.dispense = MIX_FLOW
     pip1000.flow_rate.blow_out = 300
 
     # FIXTURES & MODULES
@@ -63,6 +65,7 @@ def run(protocol: protocol_api.ProtocolContext):
     temp_adapter = temp_module.load_adapter('opentrons_96_well_aluminum_block')
     mag_block = protocol.load_module('magneticBlockV1', 'C1') 
     heater_shaker = protocol.load_module('heaterShakerModuleV1', 'D1')
+    shaker_adapter = heater_shaker.load_adapter('opentrons_96_deep_well_adapter')
 
     # LABWARE
     mixing_tips_1000 = protocol.load_labware('opentrons_flex_96_tiprack_1000ul', 'A1')
@@ -73,11 +76,15 @@ def run(protocol: protocol_api.ProtocolContext):
     final_elution_plate = protocol.load_labware('opentrons_96_wellplate_200ul_pcr_full_skirt', 'B3')
     reagent_reservoir = protocol.load_labware('nest_12_reservoir_15ml', 'D2')
     waste_reservoir = protocol.load_labware('nest_12_reservoir_15ml', 'C3')
+    # Beads sit in a deep well column on the heater-shaker so they can be resuspended by shaking
+    bead_plate = shaker_adapter.load_labware('nest_96_wellplate_2ml_deep')
+    # First pass through each 50 µL rack uses the tip tracker (transfer -> wash -> elution)
+    pip50.tip_racks = [transfer_tips_50, wash_tips_50, elution_tips_50]
 
     # LIQUIDS
     dnase_free_water = reagent_reservoir.wells()[0]
     dna_wash_buffer = reagent_reservoir.wells()[2]
-    water_magbead_mix = reagent_reservoir.wells()[11]
+    water_magbead_mix = bead_plate.columns()[0][0]
     waste = waste_reservoir.wells()[0]
 
     # Define liquids
@@ -87,20 +94,29 @@ def run(protocol: protocol_api.ProtocolContext):
 
     dnase_free_water.load_liquid(water_liquid, 3000)
     dna_wash_buffer.load_liquid(wash_buffer_liquid, 6000)
-    water_magbead_mix.load_liquid(water_magbead_liquid, 3347.5)
-
-    sample_columns = sample_plate.columns()
-    elution_columns = final_elution_plate.columns()
+    for well in bead_plate.columns()[0]:
+        well.load_liquid(water_magbead_liquid, 3347.5 / 8)
+
+    # A-row well of every column, resolved once for the 8-channel pipettes
+    sample_top_wells = [column[0] for column in sample_plate.columns()]
+    elution_top_wells = [column[0] for column in final_elution_plate.columns()]
+    # Aspirate/dispense points on labware that never moves, built once
+    waste_loc = waste.bottom(1)
+    water_loc = dnase_free_water.bottom(0.2)
+    elution_dispense_locs = [well.bottom(0.5) for well in elution_top_wells]
+    elution_blowout_locs = [well.top(-2) for well in elution_top_wells]
+    mixing_tip_heads = [column[0] for column in mixing_tips_1000.columns()]
+    transfer_tip_heads = [column[0] for column in transfer_tips_50.columns()]
+    elution_tip_heads = [column[0] for column in elution_tips_50.columns()]
 
     # FUNCTIONS
-    # Updated drop_tip functions to use waste_chute
-    def drop_tip_50(): pip50.return_tip() if DryRun else pip50.drop_tip(waste_chute)
-    def drop_tip_1000(): pip1000.return_tip() if DryRun else pip1000.drop_tip(waste_chute)
+    # Updated drop_tip function to use waste_chute
+    # DryRun can't change mid-run, so pick the drop behaviour once
+    # pip1000 only ever returns its mixing tips, so only pip50 needs a drop helper
+    drop_tip_50 = pip50.return_tip if DryRun else (lambda: pip50.drop_tip(waste_chute))
 
     def bead_mixing(well, pip, mvol, reps=8):
         vol = 200
-        pip.flow_rate.aspirate = 500
-        pip.flow_rate.dispense = 500
         center = well.top().move(types.Point(0, 0, 5))
         aspbot = well.bottom().move(types.Point(0, 2, 1))
         asptop = well.bottom().move(types.Point(0, -2, 2))
@@ -112,111 +128,108 @@ def run(protocol: protocol_api.ProtocolContext):
             pip.dispense(vol, distop)
             pip.aspirate(vol, asptop)
             pip.dispense(vol, disbot)
-        pip.flow_rate.aspirate = 50
-        pip.flow_rate.dispense = 150
 
     def mixing(well, pip, mvol, reps=8):
         center = well.top(5)
         asp = well.bottom(1)
         disp = well.top(-8)
         vol = min(mvol, 1000) * 0.8
-        pip.flow_rate.aspirate = 500
-        pip.flow_rate.dispense = 500
         pip.move_to(center)
         for i in range(reps):
             pip.aspirate(vol, asp)
             pip.dispense(vol, disp)
-        pip.flow_rate.aspirate = 10 if pip == pip50 else 50
-        pip.flow_rate.dispense = 20 if pip == pip50 else 150
+
+    def distribute_to_columns(pip, vol, source, disposal=10, air=20):
+        # One aspirate for all 12 columns: pre-airgap, then dispense from the top of each column
+        pip.aspirate(air, source.top(), rate=50 / MIX_FLOW)
+        pip.aspirate(vol * 12 + disposal, source.bottom(0.3), rate=50 / MIX_FLOW)
+        for well in sample_top_wells:
+            pip.dispense(vol, well.top(-2), rate=150 / MIX_FLOW)
+        pip.blow_out(source.top())
 
     # START
     protocol.comment('------STARTING PROTOCOL------')
     protocol.comment('STEP 1: Pre-mix magnetic bead reservoir')
-    pip1000.pick_up_tip(mixing_tips_1000.columns()[0][0])
     
-    # STEP 2: Transfer magbeads (mix before each aspirate)
-    protocol.comment('STEP 2: Transfer magbeads with 50µL tips (with mixing before each)')
-    pip50.pick_up_tip(transfer_tips_50.columns()[0][0])
-    for col_idx in range(12):
-        current_column = sample_columns[col_idx]
-        bead_mixing(water_magbead_mix, pip1000, 200 - (10 * col_idx), 5)
-        pip50.aspirate(26, water_magbead_mix.bottom(0.3))
-        pip50.dispense(26, current_column[0].bottom(0.3))
-        pip50.return_tip()
-        if col_idx < 11:
-            pip50.pick_up_tip(transfer_tips_50.columns()[col_idx + 1][0])
-    pip1000.return_tip()
-
-    # STEP 4: Final mix with pip50
-    protocol.comment('STEP 4: Final mix with pip50')
-    for col_idx in range(12):
-        pip50.pick_up_tip(transfer_tips_50.columns()[col_idx][0])
-        mixing(sample_columns[col_idx][0], pip50, 20, 20)
+    # STEP 2: Transfer magbeads (shake once, then the p50 per column so the bead:sample ratio stays exact)
+    protocol.comment('STEP 2: Transfer magbeads with 50µL tips, then mix each column with the same tip')
+    heater_shaker.close_labware_latch()
+    if DryRun:
+        pip1000.pick_up_tip(mixing_tip_heads[0])
+        bead_mixing(water_magbead_mix, pip1000, 200, 5)
+        pip1000.return_tip()
+    else:
+        heater_shaker.set_and_wait_for_shake_speed(1800)
+        protocol.delay(seconds=30)
+        heater_shaker.deactivate_shaker()
+
+    # STEP 4: Final mix with pip50 (fused with the bead transfer: one tip cycle per column)
+    bead_loc = water_magbead_mix.bottom(0.3)
+    for well in sample_top_wells:
+        pip50.pick_up_tip()
+        pip50.aspirate(26, bead_loc, rate=20 / MIX_FLOW)
+        pip50.dispense(26, well.bottom(0.3), rate=20 / MIX_FLOW)
+        mixing(well, pip50, 20, 20)
         pip50.return_tip()
 
     # STEP 5: Incubate
-    protocol.comment('STEP 5: Incubate samples at room temp')
-    protocol.delay(minutes=5 if not DryRun else 0.5)
+    protocol.comment('STEP 5: Incubate samples at room temp (pre-mix elution water meanwhile)')
+    incubation = protocol.create_timer(seconds=60 * (5 if not DryRun else 0.5))
+    pip1000.pick_up_tip(mixing_tip_heads[3])
+    mixing(dnase_free_water, pip1000, bead_mixing_volume, 5)
+    pip1000.return_tip()
+    protocol.wait_for_tasks([incubation])
 
     # STEP 6: Move to magnet
     protocol.comment('STEP 6: Move to magnet')
     protocol.move_labware(sample_plate, mag_block, use_gripper=True)
+    # Locations hold deck coordinates, so build the sample plate's only once it sits on the magnet
+    supernatant_locs = [well.bottom(0.3) for well in sample_top_wells]
+    eluate_locs = [well.bottom(0.2) for well in sample_top_wells]
 
     # STEP 7: Magnetic separation
-    protocol.comment('STEP 7: Magnet incubation')
-    protocol.delay(minutes=magbead_incubation_time if not DryRun else 0.5)
+    protocol.comment('STEP 7: Magnet incubation (pre-mix wash buffer meanwhile)')
+    separation = protocol.create_timer(seconds=60 * (magbead_incubation_time if not DryRun else 0.5))
+    pip1000.pick_up_tip(mixing_tip_heads[1])  # kept on until the wash buffer is distributed in STEP 9
+    mixing(dna_wash_buffer, pip1000, bead_mixing_volume, 5)
+    protocol.wait_for_tasks([separation])
 
     # STEP 8: Remove supernatant
-    protocol.comment('STEP 8: Remove supernatant')
-    for col_idx in range(12):
-        pip50.pick_up_tip(transfer_tips_50.columns()[col_idx][0])
-        pip50.aspirate(35, sample_columns[col_idx][0].bottom(0.3), rate=0.75)
-        pip50.dispense(35, waste.bottom(1))
-        pip50.drop_tip()
+    protocol.comment('STEPS 8-10: Remove supernatant, add wash buffer, remove wash')
+    for tip, supernatant in zip(transfer_tip_heads, supernatant_locs):
+        pip50.pick_up_tip(tip)  # returned tips are reused by position
+        pip50.aspirate(35, supernatant, rate=7.5 / MIX_FLOW)
+        pip50.dispense(35, waste_loc, rate=20 / MIX_FLOW)
+        drop_tip_50()
 
     # STEP 9: Add wash buffer
-    protocol.comment('STEP 9: Add wash buffer')
-    pip1000.pick_up_tip(mixing_tips_1000.columns()[1][0])
-    mixing(dna_wash_buffer, pip1000, bead_mixing_volume, 5)
+    distribute_to_columns(pip1000, 50, dna_wash_buffer)
     pip1000.return_tip()
 
-    for col_idx in range(12):
-        pip50.pick_up_tip(wash_tips_50.columns()[col_idx][0])
-        pip50.aspirate(50, dna_wash_buffer.bottom(0.3))
-        pip50.dispense(50, sample_columns[col_idx][0].bottom(0.5))
-        pip50.blow_out(sample_columns[col_idx][0].top(-2))
-        pip50.return_tip()
-
     # STEP 10: Remove wash
-    protocol.comment('STEP 10: Remove wash')
-    
     for col_idx in range(12):
-        pip50.pick_up_tip(wash_tips_50.columns()[col_idx][0])
-        pip50.aspirate(50, sample_columns[col_idx][0].bottom(0.3), rate=0.10)
-        pip50.dispense(50, waste.bottom(1))
-        pip50.drop_tip()
+        pip50.pick_up_tip()
+        pip50.aspirate(50, supernatant_locs[col_idx], rate=1 / MIX_FLOW)
+        pip50.dispense(50, waste_loc, rate=20 / MIX_FLOW)
+        drop_tip_50()
 
     if not DryRun:
         protocol.pause("Ensure all buffer removed.")
         
     # STEP 11: Add elution water
     protocol.comment('STEP 11: Add elution water')
-    pip1000.pick_up_tip(mixing_tips_1000.columns()[3][0])
-    mixing(dnase_free_water, pip1000, bead_mixing_volume, 5)
-    pip1000.return_tip()
-
     for col_idx in range(12):
-        pip50.pick_up_tip(elution_tips_50.columns()[col_idx][0])
-        pip50.aspirate(20, dnase_free_water.bottom(0.2))
-        pip50.dispense(20, sample_columns[col_idx][0].bottom(0.2))
+        pip50.pick_up_tip()
+        pip50.aspirate(20, water_loc, rate=10 / MIX_FLOW)
+        pip50.dispense(20, eluate_locs[col_idx], rate=20 / MIX_FLOW)
         pip50.return_tip()
 
     # STEP 12: Remove from magnet and mix
     protocol.comment('STEP 12: Elution mixing')
     protocol.move_labware(sample_plate, temp_adapter, use_gripper=True)
-    for col_idx in range(12):
-        pip50.pick_up_tip(elution_tips_50.columns()[col_idx][0])
-        mixing(sample_columns[col_idx][0], pip50, 18, 20)
+    for tip, well in zip(elution_tip_heads, sample_top_wells):
+        pip50.pick_up_tip(tip)
+        mixing(well, pip50, 18, 20)
         pip50.return_tip()
 
     # STEP 13: Elution incubation
@@ -225,16 +238,16 @@ def run(protocol: protocol_api.ProtocolContext):
 
     # STEP 14: Final magnet separation
     protocol.comment('STEP 14: Final magnet separation')
-    protocol.move_labware(sample_plate, mag_block, use_gripper=True)
+    protocol.move_labware(sample_plate, mag_block, use_gripper=True)  # same slot, eluate_locs still valid
     protocol.delay(minutes=magbead_incubation_time if not DryRun else 0.5)
 
     # STEP 15: Transfer eluted DNA
     protocol.comment('STEP 15: Transfer eluted DNA')
-    for col_idx in range(12):
-        pip50.pick_up_tip(elution_tips_50.columns()[col_idx][0])
-        pip50.aspirate(18, sample_columns[col_idx][0].bottom(0.2), rate=0.1)
-        pip50.dispense(18, elution_columns[col_idx][0].bottom(0.5))
-        pip50.blow_out(elution_columns[col_idx][0].top(-2))
-        pip50.drop_tip()
+    for tip, eluate, dest, blowout in zip(elution_tip_heads, eluate_locs, elution_dispense_locs, elution_blowout_locs):
+        pip50.pick_up_tip(tip)
+        pip50.aspirate(18, eluate, rate=1 / MIX_FLOW)
+        pip50.dispense(18, dest, rate=20 / MIX_FLOW)
+        pip50.blow_out(blowout)
+        drop_tip_50()
 
     protocol.comment('------PROTOCOL COMPLETE------')
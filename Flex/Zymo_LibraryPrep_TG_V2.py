@@ -10,7 +10,7 @@ metadata = {
 
 requirements = {
     'robotType': 'Flex',
-    'apiLevel': '2.19'
+    'apiLevel': '2.27'
 }
 
 def add_parameters(parameters):
@@ -49,6 +49,15 @@ def run(protocol: protocol_api.ProtocolContext):
     # Tip1000 - 160uL/s
     # well bottom clearance of 1 mm for aspirate and dispense actions
 
+    # Flow rate presets (aspirate, dispense) in uL/s, set once per section instead of rate= on every call
+    # Rates match the original rate= values against the 160uL/s base (0.03 -> 4.8, 0.05 -> 8)
+    FLOW_SETUP = (4.8, 8) # premix/DNA aspiration and the combined dispense
+    FLOW_MIX = (8, 8) # sample mix; the final stroke dispenses at rate=0.5 (4uL/s)
+    FLOW_POOL = (4, 2.4) # slow pooling of the PCR product
+
+    def set_flow(preset):
+        pip96.flow_rate.aspirate, pip96.flow_rate.dispense = preset
+
     chute = protocol.load_waste_chute()
 
 # DECK 1
@@ -64,7 +73,6 @@ def run(protocol: protocol_api.ProtocolContext):
     tc_mod = protocol.load_module(module_name="thermocyclerModuleV2")
     tc_mod.open_lid()
     mag_block = protocol.load_module('magneticBlockV1', 'D2') 
-    chute = protocol.load_waste_chute()
     
 # LOAD LABWARE
     sample_plate = protocol.load_labware('opentrons_96_wellplate_200ul_pcr_full_skirt', 'C2') # fix location
@@ -84,17 +92,11 @@ def run(protocol: protocol_api.ProtocolContext):
     dna_vol = 2
     pool_vol = 6.5
 
-    def drop(): 
-        if DryRun:
-            pip96.return_tip()
-        else:
-            pip96.drop_tip(chute)
+    # DryRun can't change mid-run, so pick the behaviour once
+    drop = pip96.return_tip if DryRun else (lambda: pip96.drop_tip(chute))
     
-    def move_chute(labware):
-        if DryRun:
-            protocol.move_labware(labware, chute, use_gripper=False) 
-        else:
-            protocol.move_labware(labware, chute, use_gripper=True)
+    def move_chute(labware, use_gripper=not DryRun):
+        protocol.move_labware(labware, chute, use_gripper=use_gripper)
 
     def move_gripper(labware, loc): 
         protocol.move_labware(labware=labware, new_location=loc, use_gripper=True)
@@ -102,18 +104,19 @@ def run(protocol: protocol_api.ProtocolContext):
     def move_manually(labware, loc):
         protocol.move_labware(labware=labware, new_location=loc, use_gripper=False)
 
-    def mix(mix,volume,labware):
-        for x in range (mix):
-            pip96.aspirate(volume,labware,rate=0.03) # 0.2 rate is 32uL/sec
-            pip96.dispense(volume,labware,rate=0.03) 
+    def prepare_pooling():
+        pip96.configure_nozzle_layout(style=COLUMN, start="A1", tip_racks=[tip50_partial1])
+        pip96.pick_up_tip()
 
 ## START PROTOCOL
     protocol.comment('------SECTION 1:1-STEP PCR-----')
 
 # Turn Off Temp Mod
     temp_module.deactivate()
+    lid_tasks = []
     if not DryRun and using_thermocycler:
-        tc_mod.set_lid_temperature(temperature=105)
+        # Lid heats in the background while the plate is set up
+        lid_tasks.append(tc_mod.start_set_lid_temperature(temperature=105))
         
 # # 1 - Pierce the foil 
 #     pip96.configure_nozzle_layout(style=ALL,start="A1")
@@ -130,15 +133,19 @@ def run(protocol: protocol_api.ProtocolContext):
 # Transfer DNA and Master Mix
     pip96.configure_nozzle_layout(style=ALL,start="A1")
     pip96.pick_up_tip(tip50_full1)
-    pip96.aspirate(dna_vol,dna_samples.bottom(2),rate=0.03)
-    pip96.aspirate(premix_vol,premixes.bottom(2),rate=0.03) # aspirate the desired volume + 1uL for reverse dispensing.
+    set_flow(FLOW_SETUP) # after pickup: loading 50uL tips resets the flow rates
+    pip96.aspirate(1,dna_samples.top()) # pre-airgap
+    # DNA first so clean tips are the only ones to enter the DNA plate; premix goes on top
+    pip96.aspirate(dna_vol,dna_samples.bottom(2))
+    pip96.aspirate(premix_vol,premixes.bottom(2))
     protocol.delay(seconds=1) #added 1 sec delay to allow for liquid to settle after aspiration before tip removal from the liquid
-    pip96.dispense(dna_vol+premix_vol,samples.bottom(2),push_out=0,rate=0.05)
-    for x in range(2):
-        pip96.aspirate(7,samples.bottom(2),rate=0.05)
-        pip96.dispense(7,samples.bottom(2),push_out=0,rate=0.05)
-    pip96.aspirate(7,samples.bottom(2),rate=0.05)
-    pip96.dispense(7,samples.bottom(3),push_out=1.8,rate=0.025)
+    sample_bot = samples.bottom(2)
+    pip96.dispense(dna_vol+premix_vol,sample_bot,push_out=0)
+    set_flow(FLOW_MIX)
+    pip96.mix(2,7,sample_bot,final_push_out=0)
+    # Last stroke dispenses slower and higher so the push-out clears the tips without splashing
+    pip96.aspirate(7,sample_bot)
+    pip96.dispense(7,samples.bottom(3),push_out=1.8,rate=0.5)
     protocol.delay(seconds=1) #added 1 sec delay to allow for liquid to settle after mixing before tip removal from the liquid
     drop()
 
@@ -150,6 +157,7 @@ def run(protocol: protocol_api.ProtocolContext):
         tc_mod.open_lid()
         
         move_gripper(sample_plate,tc_mod)
+        protocol.wait_for_tasks(lid_tasks)
         tc_mod.close_lid()
 
         # Wrap thermocycler operations in dry run condition
@@ -163,7 +171,10 @@ def run(protocol: protocol_api.ProtocolContext):
             {"temperature":55, "hold_time_seconds":30},
             {"temperature":72, "hold_time_seconds":180}
         ]
-            tc_mod.execute_profile(steps=profile2, repetitions=42)
+            profile_task = tc_mod.start_execute_profile(steps=profile2, repetitions=42)
+            # Set up the pooling pipette while the plate cycles
+            prepare_pooling()
+            protocol.wait_for_tasks([profile_task])
             tc_mod.set_block_temperature(temperature=4)
         
         tc_mod.open_lid()
@@ -180,13 +191,17 @@ def run(protocol: protocol_api.ProtocolContext):
     pools_samples = sample_plate.rows()[0][:12]
     final_plate = pooled_plate.rows()[0][0]
 
-    pip96.configure_nozzle_layout(style=COLUMN, start="A1", tip_racks=[tip50_partial1])
-    pip96.pick_up_tip()
+    if not pip96.has_tip:
+        prepare_pooling()
+    # One column per trip: the slow aspirate needs its settle delay before the tip leaves each well
+    set_flow(FLOW_POOL)
+    pool_bot = final_plate.bottom(2)
+    pool_top = final_plate.top(-1)
     for well in pools_samples:
-        pip96.aspirate(pool_vol,well.bottom(1),rate=0.025)
-        protocol.delay(seconds=1)
-        pip96.dispense(pool_vol,final_plate.bottom(2),push_out=4,rate=0.015)
-        pip96.blow_out(final_plate.top(-1))
+        pip96.aspirate(pool_vol,well.bottom(1))
+        protocol.delay(seconds=1) #allow liquid to settle after aspiration before tip removal from the liquid
+        pip96.dispense(pool_vol,pool_bot,push_out=4)
+        pip96.blow_out(pool_top)
     pip96.drop_tip()
 
     protocol.comment('------PROTOCOL IS COMPLETE------')
\ No newline at end of file
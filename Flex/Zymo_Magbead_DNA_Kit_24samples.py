@@ -1,9 +1,9 @@
 from opentrons.protocol_api.labware import Labware
-from opentrons import types
 from opentrons.types import Point
 import math
-import numpy as np
-from dataclasses import dataclass
+import itertools
+from dataclasses import dataclass, field
+from typing import Optional
 
 
 metadata = {
@@ -39,7 +39,7 @@ def add_parameters(parameters):
         default = False
     )
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ReagentVolume:
     SAMPLE:                 float = 200.0
     MAGBINDING_BUFFER:      float = 600.0
@@ -52,22 +52,17 @@ class ReagentVolume:
     SUPERNATANT_EXT:        float = 200.0 #2nd aspiration in super removal
     AIR_GAP:                float = 20.0 #Default airgap size
 
-    @property
-    def STARTING_VOLUME(self):
-        """Returns starting sample volume"""
-        return self.SAMPLE
-    
-    @property
-    def BINDING_BUFFER_VOLUME(self):
-        """Returns initial value of magbeads + buffer in the reservoir"""
-        return self.MAGBINDING_BUFFER + self.MAGBEADS
-    
-    @property
-    def TOTAL_BINDING_VOLUME(self):
-        """Returns total volume of beads + sample + buffer"""
-        return self.MAGBINDING_BUFFER + self.MAGBEADS + self.SAMPLE
+    #Derived volumes, computed once in __post_init__ (frozen, so set through object.__setattr__)
+    STARTING_VOLUME:        float = field(init=False) #Starting sample volume
+    BINDING_BUFFER_VOLUME:  float = field(init=False) #Magbeads + buffer in the reservoir
+    TOTAL_BINDING_VOLUME:   float = field(init=False) #Beads + sample + buffer
+
+    def __post_init__(self):
+        object.__setattr__(self, 'STARTING_VOLUME', self.SAMPLE)
+        object.__setattr__(self, 'BINDING_BUFFER_VOLUME', self.MAGBINDING_BUFFER + self.MAGBEADS)
+        object.__setattr__(self, 'TOTAL_BINDING_VOLUME', self.BINDING_BUFFER_VOLUME + self.SAMPLE)
 
-@dataclass
+@dataclass(slots=True)
 class Timer:
     MAGNET_SETTLING:        float = 2.0
     MAGNET_SETTLING_EXT:    float = 3.0
@@ -78,43 +73,45 @@ class Timer:
     BIND:                   float = 3.0
     BEAD_DRY:               float = 10.0
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class MixingCycle:
     PRE_MIX_MAGBEADS:       int = 3 #Repetitions to mix magbeads + binding buffer before transfer
     MIX_BINDING_SAMPLES:    int = 8 #Reps to mix sample + magbeads + binding buffer
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ShakerRPM:
     WASH_RPM:               int = 1200 #Shaker speed during washes
     ELUTE_RPM:              int = 800 #During elution mixing
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Height:
     BOTTOM_1MM:             float = 1 
     BOTTOM_0_5MM:           float = 0.5
     BOTTOM_2MM:             float = 2
     TOP_5MM:                float = -5 #Height that reagent tip dispenses at
+    LARGE_MIX_Z:            tuple = (1, 8, 16, 24) #smart_mix dispense heights above well bottom
+    SMALL_MIX_Z:            tuple = (0.1, 0.5, 1)
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class DeckLayout:
     #Module  positions
-    MAGNETIC_BLOCK =    'C1'
-    HEATER_SHAKER  =    'D1' #Sample plate is initially loaded on heater shaker adapter
-    TEMP_MODULE    =    'A3' #Elution plate initally loaded on temp module adapter
+    MAGNETIC_BLOCK: str =    'C1'
+    HEATER_SHAKER:  str =    'D1' #Sample plate is initially loaded on heater shaker adapter
+    TEMP_MODULE:    str =    'A3' #Elution plate initally loaded on temp module adapter
     
     #Labware stuff
-    LIQUID_WASTE   =    'C3'
-    REAGENT_RES_1  =    'D2'
-    REAGENT_RES_2  =    'C2'
-    TRASH_BIN      =    'D3'
+    LIQUID_WASTE:   str =    'C3'
+    REAGENT_RES_1:  str =    'D2'
+    REAGENT_RES_2:  str =    'C2'
+    TRASH_BIN:      str =    'D3'
 
     #Tips
-    TIPS_1000_1    =    'A2'
-    TIPS_1000_2    =    'B2'
-    TIPS_1000_3    =    'B3'
+    TIPS_1000_1:    str =    'A2'
+    TIPS_1000_2:    str =    'B2'
+    TIPS_1000_3:    str =    'B3'
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FlowRate:
     """Flow rates in uL/s"""
     SUPER_ASPIRATION:           float = 100 #Supernatant first phase
@@ -131,22 +128,35 @@ class FlowRate:
     DEFAULT_DISPENSE:           float = 180
     DEFAULT_BLOW_OUT:           float = 180
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class LabwareType:
-    RESERVOIR = "nest_12_reservoir_15ml"
-    DEEPWELL = "nest_96_wellplate_2ml_deep"
+    RESERVOIR: str = "nest_12_reservoir_15ml"
+    DEEPWELL: str = "nest_96_wellplate_2ml_deep"
 
-@dataclass
+@dataclass(slots=True)
 class RunTimeParameters:
     """Used for tracking and some settings"""
-    USE_GRIPPER = True
-    MOUNT = 'right'
-    MAX_SAMPLES = 48
-    WASH_COUNT   = 1
-    TIP1000     = 0
-    TIP200      = 0
-    DROP_COUNT  = 0
-    WASTE_VOL   = 0
+    USE_GRIPPER: bool   = True
+    MOUNT: str          = 'right'
+    MAX_SAMPLES: int    = 48
+    WASH_COUNT: int     = 1
+    TIP1000: int        = 0
+    TIP200: int         = 0
+    DROP_COUNT: int     = 0
+    WASTE_VOL: float    = 0
+    FLOW_RATES: Optional[tuple] = None #Last (aspirate, dispense, blow_out) set on the pipette
+    CURRENT_RPM: int    = 0 #Heater-shaker speed, 0 when stopped
+    LATCH_OPEN: Optional[bool] = None #Heater-shaker latch state, None until first set
+
+#Reagent liquids: (name, location in run(), display color, ReagentVolume field per sample)
+LIQUID_DEFS = (
+    ('MagBinding Buffer With Beads', 'binding_buffer',   '#008000', 'BINDING_BUFFER_VOLUME'),
+    ('MagBinding Buffer Wash',       'binding_buffer_2', '#008000', 'MAGBINDING_BUFFER_WASH'),
+    ('MagWash 1',                    'wash_1',           '#A52A2A', 'MAGWASH_1'),
+    ('MagWash 2-1',                  'wash_2_1',         '#A52A2A', 'MAGWASH_2_1'),
+    ('MagWash 2-2',                  'wash_2_2',         '#00FFFF', 'MAGWASH_2_2'),
+    ('DNase/RNase Free Water',       'elution_solution', '#0000FF', 'ELUTION'),
+    )
 
 
 def run(ctx):
@@ -174,7 +184,28 @@ def run(ctx):
     mod_heater_shaker = ctx.load_module('heaterShakerModuleV1',deck.HEATER_SHAKER)
     adap_heater_shaker = mod_heater_shaker.load_adapter('opentrons_96_deep_well_adapter')
     sample_plate = adap_heater_shaker.load_labware(labware_types.DEEPWELL,'Samples') #Sample plate initially loaded at D1 
-    mod_heater_shaker.close_labware_latch()
+
+    def set_latch(open_latch: bool):
+        """Open or close the heater-shaker latch, skipping the command if it is already there"""
+        if runtime.LATCH_OPEN == open_latch:
+            return
+        if open_latch:
+            mod_heater_shaker.open_labware_latch()
+        else:
+            mod_heater_shaker.close_labware_latch()
+        runtime.LATCH_OPEN = open_latch
+
+    def set_shake_speed(rpm: int):
+        """Shake at rpm (0 stops the shaker), skipping the command if already at that speed"""
+        if rpm == runtime.CURRENT_RPM:
+            return
+        if rpm:
+            mod_heater_shaker.set_and_wait_for_shake_speed(rpm)
+        else:
+            mod_heater_shaker.deactivate_shaker()
+        runtime.CURRENT_RPM = rpm
+
+    set_latch(False)
 
     #Load temperature module
     temp = ctx.load_module('temperature module gen2', deck.TEMP_MODULE)
@@ -212,14 +243,13 @@ def run(ctx):
     tips1000 = ctx.load_labware('opentrons_flex_96_tiprack_1000ul', deck.TIPS_1000_1,'Tips 1')
     tips1001 = ctx.load_labware('opentrons_flex_96_tiprack_1000ul', deck.TIPS_1000_2,'Tips 2')
     tips1002 = ctx.load_labware('opentrons_flex_96_tiprack_1000ul', deck.TIPS_1000_3,'Tips 3')
-    total_tips = [*tips1000.columns(),*tips1001.columns(),*tips1002.columns()] #Unpack list
+    tip_columns = itertools.chain(tips1000.columns(), tips1001.columns(), tips1002.columns()) #Handed out in rack order
 
     #Reserve Tips
-    reagent_tips = total_tips[0] #Reserve first col for reagent distribution
-    supernatant_tips = total_tips[1:num_sample_columns+1] #Tips for super removal
-    elution_tips = total_tips[1 + num_sample_columns: 1+ 2 * num_sample_columns] #Tips for elution
-    remaining_tips = total_tips[1+2*num_sample_columns:]
-    runtime.TIP1000 = (len(total_tips) - len(remaining_tips)) #Calc number of reserved tips.
+    reagent_tips = next(tip_columns) #Reserve first col for reagent distribution
+    supernatant_tips = [next(tip_columns) for _ in range(num_sample_columns)] #Tips for super removal
+    elution_tips = [next(tip_columns) for _ in range(num_sample_columns)] #Tips for elution
+    runtime.TIP1000 = 1 + 2 * num_sample_columns #Number of tip columns taken so far
 
     # Load instruments
     m1000 = ctx.load_instrument('flex_8channel_1000', runtime.MOUNT, tip_racks=[tips1000, tips1001, tips1002])
@@ -230,104 +260,60 @@ def run(ctx):
                                    blow_out_rate=flow_rates.DEFAULT_BLOW_OUT):
         """
         Change aspiration/dispense flow rate or reset to default (call with no parameters).
+        Rates that are already set are left alone.
         """
-        m1000.flow_rate.aspirate = aspirate_rate
-        m1000.flow_rate.dispense = dispense_rate
-        m1000.flow_rate.blow_out = blow_out_rate
+        last = runtime.FLOW_RATES or (None, None, None)
+        if aspirate_rate != last[0]:
+            m1000.flow_rate.aspirate = aspirate_rate
+        if dispense_rate != last[1]:
+            m1000.flow_rate.dispense = dispense_rate
+        if blow_out_rate != last[2]:
+            m1000.flow_rate.blow_out = blow_out_rate
+        runtime.FLOW_RATES = (aspirate_rate, dispense_rate, blow_out_rate)
 
     reset_or_update_flow_rates()
 
-    # Define liquid reagent colors
-    colors = [
-        '#008000','#008000','#A52A2A','#A52A2A',
-        '#00FFFF','#0000FF','#800080','#ADD8E6',
-        '#FF0000','#FFFF00','#FF00FF','#00008B',
-        '#7FFFD4','#FFC0CB','#FFA500','#00FF00',
-        '#C0C0C0',"#6D2696"
-        ]
-
-    locations = [
-        binding_buffer,
-        binding_buffer_2,
-        wash_1,
-        wash_2_1,
-        wash_2_2,
-        elution_solution
-        ]
-    
-    vols = [
-        reagent_volumes.BINDING_BUFFER_VOLUME,
-        reagent_volumes.MAGBINDING_BUFFER_WASH,
-        reagent_volumes.MAGWASH_1,
-        reagent_volumes.MAGWASH_2_1,
-        reagent_volumes.MAGWASH_2_2,
-        reagent_volumes.ELUTION
-    ]
-
-    liquids = [
-        'MagBinding Buffer With Beads',
-        'MagBinding Buffer Wash',
-        'MagWash 1',
-        'MagWash 2-1',
-        'MagWash 2-2',
-        'DNase/RNase Free Water'
-        ]
+    # Reagent wells by the names used in LIQUID_DEFS (always a list)
+    reagent_locations = {
+        'binding_buffer': binding_buffer,
+        'binding_buffer_2': binding_buffer_2,
+        'wash_1': wash_1,
+        'wash_2_1': wash_2_1,
+        'wash_2_2': wash_2_2,
+        'elution_solution': [elution_solution]
+        }
 
     # Define liquids
     sample_liquid = ctx.define_liquid(name='Samples',description='Samples',display_color='#C0C0C0')
-    
-    for sample in sample_wells: #Sample wells is defined as individual wells on sample plate.
-        sample.load_liquid(liquid=sample_liquid, volume=reagent_volumes.SAMPLE)
-
-    if len(colors) > len(liquids): #Truncate colors list due to zip used later.
-        colors = colors[:len(liquids)]
+    sample_plate.load_liquid(sample_wells, reagent_volumes.SAMPLE, sample_liquid) #One call for every sample well
 
     def liquids_(liquid_name, location, color, vol):
-        # TODO Re-write this function 
+        """Define a reagent and load it into its reservoir wells with one call (1500 uL dead volume per well)"""
         sampnum = rounded_sample_count
-        
-        if liquid_name == "MagBinding Buffer With Beads":
-            extra_samples = math.ceil(1500/reagent_volumes.BINDING_BUFFER_VOLUME)
-        else:
-            extra_samples = math.ceil(1500/vol)
-        
-        if isinstance(location,list):
-            limit = runtime.MAX_SAMPLES/len(location)
-            iterations = math.ceil(sampnum/limit)
-            left = sampnum - limit
-            while left>limit:
-                left = left - limit
-            if left > 0:
-                last_iteration_samp_num = left
-            elif left < 0:
-                last_iteration_samp_num = sampnum
-            else:
-                last_iteration_samp_num = limit
-
-            samples_per_well = []
-            for i in range(iterations):
-                if i == (iterations-1):
-                    samples_per_well.append(last_iteration_samp_num)
-                else:
-                    samples_per_well.append(limit)
-
-            liquid_name = ctx.define_liquid(name=str(liquid_name),description=str(liquid_name),display_color=color)
-            for sample, well in zip(samples_per_well,location[:len(samples_per_well)]):
-                v = vol*(sample+extra_samples)
-                well.load_liquid(liquid=liquid_name,volume=v)
-        else:
-            v = vol*(sampnum+extra_samples)
-            liquid_name = ctx.define_liquid(name=str(liquid_name),description=str(liquid_name),display_color=color)
-            location.load_liquid(liquid=liquid_name,volume=v)
+        extra_samples = math.ceil(1500/vol)
+
+        #Each well serves up to limit samples; the last one takes what is left over
+        limit = runtime.MAX_SAMPLES/len(location)
+        iterations = math.ceil(sampnum/limit)
+        last_iteration_samp_num = sampnum - limit*(iterations-1)
+        samples_per_well = [limit]*(iterations-1) + [last_iteration_samp_num]
+
+        liquid = ctx.define_liquid(name=str(liquid_name),description=str(liquid_name),display_color=color)
+        location[0].parent.load_liquid_by_well(
+            {well: vol*(sample+extra_samples) for sample, well in zip(samples_per_well, location)},
+            liquid)
 
     # Generate liquids
-    for (ll,l,c,v) in zip(liquids,locations,colors,vols):
-        liquids_(ll,l,c,v)
+    for name, location_name, color, volume_name in LIQUID_DEFS:
+        liquids_(name, reagent_locations[location_name], color, getattr(reagent_volumes, volume_name))
 
     def transport(initial_position: Labware, final_position, use_gripper=runtime.USE_GRIPPER, drop_offset=None):
         """
         Submethod - Plate movement on deck - Global Process
+        No move is issued when the plate is already at final_position.
         """
+        if initial_position.parent is final_position:
+            return
         if drop_offset:
             ctx.move_labware(initial_position, final_position, use_gripper=use_gripper, drop_offset=drop_offset)
         else:
@@ -336,12 +322,32 @@ def run(ctx):
     def aspirate_and_dispense(volume, source, destination, air_gap=reagent_volumes.AIR_GAP, blow_out=False):
         """Similar to transfer function but enabling future features"""
         m1000.aspirate(volume, source)
-        m1000.air_gap(air_gap)
+        if air_gap > 0: #A zero air gap would still withdraw the tip
+            m1000.air_gap(air_gap)
         m1000.dispense(volume + air_gap, destination)
 
         if blow_out:
             m1000.blow_out(destination)
 
+    def distribute_reagent(source_wells, volume: float, uses_per_well: int, premix_reps: int = 0):
+        """
+        Fill every sample column from its reservoir well (uses_per_well columns per well).
+        Columns sharing a well are dispensed from one aspiration as far as the tip holds them.
+        premix_reps: bead-mix each reservoir well once before its first aspiration
+        """
+        per_draw = max(1, int((m1000.max_volume - reagent_volumes.AIR_GAP) // volume))
+        for start in range(0, num_sample_columns, uses_per_well):
+            source = source_wells[start // uses_per_well]
+            columns = sample_index_columns[start:start + uses_per_well]
+            if premix_reps: #Beads don't settle in the seconds between its columns
+                smart_mix(source=source, volume=volume, large_volume_mix=True, reps=premix_reps)
+            for i in range(0, len(columns), per_draw):
+                group = columns[i:i + per_draw]
+                m1000.aspirate(volume * len(group), source.bottom(heights.BOTTOM_2MM))
+                m1000.air_gap(reagent_volumes.AIR_GAP)
+                for j, sample_col in enumerate(group): #Air gap goes out with the first dispense
+                    m1000.dispense(volume + (reagent_volumes.AIR_GAP if j == 0 else 0), sample_col[0].top(heights.TOP_5MM))
+
     def track_waste(volume: float):
         """Track volume contained in waste"""
         runtime.WASTE_VOL += (volume*8)
@@ -353,7 +359,7 @@ def run(ctx):
 
     def get_tips():
         """Retrieve non-reserved tips"""
-        m1000.pick_up_tip(total_tips[int(runtime.TIP1000)][0])
+        m1000.pick_up_tip(next(tip_columns)[0])
         runtime.TIP1000 += 1
 
     def return_tips():
@@ -368,11 +374,20 @@ def run(ctx):
             runtime.DROP_COUNT = 0
             ctx.pause("Please empty the waste bin before continuing.")
 
+    def countdown(minutes: float, msg: str):
+        """
+        Delay for minutes in 0.5 minute ticks, announcing the time left at each tick.
+        msg is formatted with {remaining} (minutes).
+        """
+        remaining = minutes
+        while remaining > 0:
+            ctx.delay(minutes=min(0.5, remaining), msg=msg.format(remaining=remaining))
+            remaining -= 0.5
+
     def move_to_magnet(source_plate: Labware, duration: float = 0):
         transport(source_plate, magblock, drop_offset={"x": 0, "y": 0, "z": -1})
-        if duration > 0:
-            for timer in np.arange(duration, -0.5): # Settling time delay with countdown timer
-                        ctx.delay(minutes=0.5, msg=f"Incubating on magnetic block – {timer} minutes remaining.")
+        if duration > 0: # Settling time delay with countdown timer
+            countdown(duration, "Incubating on magnetic block – {remaining} minutes remaining.")
 
     def shake_mix(source_plate: Labware, 
                     shake_speed: int=500, 
@@ -391,20 +406,20 @@ def run(ctx):
             """
 
             if move_to:
-                mod_heater_shaker.open_labware_latch()
+                set_latch(True)
                 transport(source_plate, adapter)
-            mod_heater_shaker.close_labware_latch() #Confirm closed
-            mod_heater_shaker.set_and_wait_for_shake_speed(shake_speed)
+            set_latch(False) #Confirm closed
+            set_shake_speed(shake_speed)
             
-            for timer in np.arange(duration,-0.5): # Settling time delay with countdown timer
-                        ctx.delay(minutes=0.5, msg= f'There are {timer} minutes left in the mixing process.')
+            countdown(duration, 'There are {remaining} minutes left in the mixing process.')
 
-            mod_heater_shaker.deactivate_shaker()
-            mod_heater_shaker.open_labware_latch()
+            set_shake_speed(0) #Shaker has to stop before the latch can open
+            set_latch(True)
 
-    def blink():
+    def blink(reps: int = 1):
+        """Flash the rail lights ahead of a pause; the pause itself raises the app alert"""
         ctx.comment("Blinking")
-        for _ in range(3):
+        for _ in range(reps):
             ctx.set_rail_lights(True)
             ctx.delay(minutes=timers.BLINK)
             ctx.set_rail_lights(False)
@@ -413,26 +428,38 @@ def run(ctx):
     def remove_supernatant(volume: float, dispose_tips=False):
         ctx.comment("Removing Supernatant")
         track_waste(volume) #Prevent overflow
+        #Both phases go out in one trip to the waste when the tip holds them
+        fused = volume + reagent_volumes.SUPERNATANT_EXT + reagent_volumes.AIR_GAP <= m1000.max_volume
 
         for super_tips, sample_col in zip(supernatant_tips, sample_index_columns):
+            head = sample_col[0]
             m1000.pick_up_tip(super_tips[0]) #Get super tips
 
             reset_or_update_flow_rates(aspirate_rate=flow_rates.SUPER_ASPIRATION,
                             dispense_rate=flow_rates.SUPER_DISPENSE)
 
-            aspirate_and_dispense(volume=volume,
-                                  source=sample_col[0].bottom(heights.BOTTOM_1MM),
-                                  destination=waste,
-                                  air_gap=reagent_volumes.AIR_GAP)
+            if fused:
+                m1000.aspirate(volume, head.bottom(heights.BOTTOM_1MM))
+            else:
+                aspirate_and_dispense(volume=volume,
+                                      source=head.bottom(heights.BOTTOM_1MM),
+                                      destination=waste,
+                                      air_gap=reagent_volumes.AIR_GAP)
             
             reset_or_update_flow_rates(aspirate_rate=flow_rates.SECOND_SUPER_ASPIRATION,
                 dispense_rate=flow_rates.SECOND_SUPER_DISPENSE)
             
-            aspirate_and_dispense(volume=reagent_volumes.SUPERNATANT_EXT,
-                                  source=sample_col[0].bottom(heights.BOTTOM_0_5MM),
-                                  destination=waste,
-                                  air_gap=reagent_volumes.AIR_GAP,
-                                  blow_out=True)
+            if fused:
+                m1000.aspirate(reagent_volumes.SUPERNATANT_EXT, head.bottom(heights.BOTTOM_0_5MM))
+                m1000.air_gap(reagent_volumes.AIR_GAP)
+                m1000.dispense(m1000.current_volume, waste)
+                m1000.blow_out(waste)
+            else:
+                aspirate_and_dispense(volume=reagent_volumes.SUPERNATANT_EXT,
+                                      source=head.bottom(heights.BOTTOM_0_5MM),
+                                      destination=waste,
+                                      air_gap=reagent_volumes.AIR_GAP,
+                                      blow_out=True)
 
             if dispose_tips:
                 drop_tips()
@@ -455,30 +482,28 @@ def run(ctx):
 
         if large_volume_mix:
             reset_or_update_flow_rates(aspirate_rate=flow_rates.MIX_ASPIRATION, dispense_rate=flow_rates.MIX_DISPENSE)
-            #Large volume positions
-            mix_positions = [source.bottom().move(types.Point(z=z)) for z in [1, 8, 16, 24]]
-            
         else:
             reset_or_update_flow_rates(aspirate_rate=flow_rates.SLOW_MIX_ASPIRATION, dispense_rate=flow_rates.SLOW_MIX_DISPENSE)
-            #Small volume positions
-            mix_positions = [source.bottom().move(types.Point(z=z)) for z in [0.1, 0.5, 1]]
 
-        num_locations = len(mix_positions)
+        #Built per call: the sample plate moves between shaker and magnet, so Locations can't be kept
+        heights_z = heights.LARGE_MIX_Z if large_volume_mix else heights.SMALL_MIX_Z
+        mix_positions = [source.bottom(z) for z in heights_z]
+        lowest = mix_positions[0]
 
         for rep in range(reps):
-            for loc_index in range(num_locations):
+            for position in mix_positions:
                 #Always aspirates from lowest position
                 aspirate_and_dispense(volume = mixing_volume,
-                                      source = mix_positions[0],
-                                      destination = mix_positions[loc_index],
+                                      source = lowest,
+                                      destination = position,
                                       air_gap=0)
 
         reset_or_update_flow_rates(aspirate_rate=flow_rates.SLOW_MIX_ASPIRATION, dispense_rate=flow_rates.SLOW_MIX_DISPENSE)
 
         #Additional slow mix
         aspirate_and_dispense(volume = mixing_volume,
-                        source = mix_positions[0],
-                        destination=mix_positions[0],
+                        source = lowest,
+                        destination=lowest,
                         air_gap=0)
 
         reset_or_update_flow_rates()
@@ -486,8 +511,8 @@ def run(ctx):
     def wash(source_plate, volume, dispose_tips=False):
         """Wash steps 
         Dispose_tips: trash tips after final use."""
-        ctx.comment(f"Starting wash #{RunTimeParameters.WASH_COUNT}")
-        RunTimeParameters.WASH_COUNT += 1
+        ctx.comment(f"Starting wash #{runtime.WASH_COUNT}")
+        runtime.WASH_COUNT += 1
         num_res_wells = len(source_plate)
         max_sample_columns = int(runtime.MAX_SAMPLES / 8)
         uses_per_res_well = max_sample_columns // num_res_wells
@@ -495,12 +520,7 @@ def run(ctx):
 
         reset_or_update_flow_rates(aspirate_rate=150, dispense_rate=200)
 
-        for index, sample_well in enumerate(sample_index_columns):
-            source = source_plate[index//uses_per_res_well]
-            
-            aspirate_and_dispense(source=source.bottom(heights.BOTTOM_2MM),
-                                  destination=sample_well[0].top(heights.TOP_5MM),
-                                  volume=volume)
+        distribute_reagent(source_plate, volume, uses_per_res_well)
         return_tips()
 
         shake_mix(source_plate=sample_plate,
@@ -512,61 +532,58 @@ def run(ctx):
 
         remove_supernatant(volume=volume, dispose_tips=dispose_tips)
 
-
     def bind():
         ctx.comment('Beginning Binding Step')
+        total_binding_volume = reagent_volumes.TOTAL_BINDING_VOLUME
 
         m1000.pick_up_tip(reagent_tips[0])
-        for index, sample_well in enumerate(sample_index_columns):
-            source = binding_buffer[index//2]
-            smart_mix(source=source,
-                      volume=reagent_volumes.BINDING_BUFFER_VOLUME,
-                      large_volume_mix=True,
-                      reps=mixing_settings.PRE_MIX_MAGBEADS)
-            
-            aspirate_and_dispense(source=source.bottom(heights.BOTTOM_2MM),
-                                  destination=sample_well[0].top(heights.TOP_5MM),
-                                  volume=reagent_volumes.BINDING_BUFFER_VOLUME)
+        distribute_reagent(binding_buffer,
+                           reagent_volumes.BINDING_BUFFER_VOLUME,
+                           uses_per_well=2,
+                           premix_reps=mixing_settings.PRE_MIX_MAGBEADS)
         return_tips()
             
         for super_tips, sample_col in zip(supernatant_tips, sample_index_columns):
             m1000.pick_up_tip(super_tips[0]) #Get super tips
 
             smart_mix(source=sample_col[0],
-                      volume=reagent_volumes.TOTAL_BINDING_VOLUME,
+                      volume=total_binding_volume,
                       reps = mixing_settings.MIX_BINDING_SAMPLES)
 
             return_tips()
 
         reset_or_update_flow_rates()
             
-        for timer in np.arange(timers.BIND,-0.5): # Settling time delay with countdown timer
-            ctx.delay(minutes=0.5, msg= f'There are {timer} minutes left in the binding process.')
+        countdown(timers.BIND, 'There are {remaining} minutes left in the binding process.')
         
-        mod_heater_shaker.open_labware_latch() #ensure open
+        set_latch(True) #ensure open
         move_to_magnet(sample_plate, timers.MAGNET_SETTLING_EXT)
-        remove_supernatant(reagent_volumes.TOTAL_BINDING_VOLUME)
+        remove_supernatant(total_binding_volume)
 
     def elute():
         mod_heater_shaker.set_and_wait_for_temperature(55)
-        mod_heater_shaker.open_labware_latch()
+        set_latch(True)
         transport(sample_plate, adap_heater_shaker)
-        mod_heater_shaker.close_labware_latch() #Confirm closed
+        set_latch(False) #Confirm closed
             
-        for timer in np.arange(timers.BEAD_DRY,-0.5): # Settling time delay with countdown timer
-                    ctx.delay(minutes=0.5, msg= f'There are {timer} minutes left in the drying process.')
+        countdown(timers.BEAD_DRY, 'There are {remaining} minutes left in the drying process.')
 
         reset_or_update_flow_rates(aspirate_rate=flow_rates.ELUTION_ASPIRATION, dispense_rate=flow_rates.ELUTION_DISPENSE)
 
-        for elute_tips, sample_col in zip(elution_tips, sample_index_columns):
+        elution_source = elution_solution.bottom(heights.BOTTOM_1MM)
+        elute_tip_refs = list(zip(elution_tips, sample_index_columns, elution_sample_index_columns))
+        for index, (elute_tips, sample_col, _) in enumerate(elute_tip_refs):
             m1000.pick_up_tip(elute_tips[0]) #Get super tips
 
-            aspirate_and_dispense(source=elution_solution.bottom(heights.BOTTOM_1MM),
+            aspirate_and_dispense(source=elution_source,
                                   destination=sample_col[0].bottom(heights.BOTTOM_2MM),
                                   volume=reagent_volumes.ELUTION,
                                   air_gap=0)
 
-            return_tips()
+            #The 8-channel holds one tip column, so only the last column's tip can stay on through
+            #the shake and settle; the rest go back to their reserved rack positions for the eluate transfer
+            if index < len(elute_tip_refs) - 1:
+                return_tips()
 
         shake_mix(source_plate=sample_plate,
                   shake_speed=shaker_settings.ELUTE_RPM,
@@ -576,8 +593,9 @@ def run(ctx):
         move_to_magnet(sample_plate, timers.MAGNET_SETTLING)
 
 
-        for elute_tips, sample_col, elute_col in zip(elution_tips, sample_index_columns, elution_sample_index_columns):
-            m1000.pick_up_tip(elute_tips[0]) #Get super tips
+        for elute_tips, sample_col, elute_col in reversed(elute_tip_refs): #Held tip's column first
+            if not m1000.has_tip:
+                m1000.pick_up_tip(elute_tips[0]) #Get super tips
 
             aspirate_and_dispense(source=sample_col[0].bottom(heights.BOTTOM_0_5MM),
                                   destination=elute_col[0].bottom(heights.BOTTOM_1MM),
@@ -587,7 +605,7 @@ def run(ctx):
             drop_tips()
 
         mod_heater_shaker.deactivate_heater()
-        mod_heater_shaker.open_labware_latch
+        set_latch(True)
 
 
 
@@ -1,13 +1,14 @@
 def get_values(*names):
     import json
-    _all_values = json.loads("""{"trash_chute":false,"USE_GRIPPER":true,"dry_run":false,"mount":"right","temp_mod":true,"res_type":"nest_12_reservoir_15ml","heater_shaker":true,"num_samples":48,"wash1_vol":500,"wash2_vol":900,"wash3_vol":900,"sample_vol":200,"bind_vol":600,"bind2_vol":500,"elution_vol":50,"protocol_filename":"Zymo_Magbead_DNA_TestRun_24samples"}""")
+    _all_values = json.loads("""{"trash_chute":false,"USE_GRIPPER":true,"dry_run":false,"mount":"right","temp_mod":true,"res_type":"nest_12_reservoir_15ml","heater_shaker":true,"num_samples":48,"wash1_vol":500,"wash2_vol":900,"wash3_vol":900,"sample_vol":200,"bind_vol":600,"bind2_vol":500,"elution_vol":50,"reuse_wash_tips":false,"protocol_filename":"Zymo_Magbead_DNA_TestRun_24samples"}""")
     return [_all_values[n] for n in names]
 
 from opentrons.types import Point
 import json
 import math
+from collections import namedtuple
+from types import SimpleNamespace
 from opentrons import types
-import numpy as np
 
 metadata = {
     'protocolName': 'Zymo Magbead DNA Extraction 48 Samples V1.3',
@@ -21,16 +22,17 @@ requirements = {
     "apiLevel": "2.22"
 }
 
-whichwash   = 1
 sample_max  = 48
-tip1k       = 0
-tip200      = 0
-drop_count  = 0
 
 def run(ctx):
     """
     DNA Extraction of 48 Samples
     """
+    # Counters shared by the helpers below; kept per run instead of as module globals
+    state = SimpleNamespace(
+        drop_count=0,
+        whichwash=1)
+
     trash_chute    = False
     USE_GRIPPER    = True
     dry_run        = False
@@ -47,10 +49,11 @@ def run(ctx):
     bind_vol       = 600
     bind2_vol      = 500
     elution_vol    = 50
+    reuse_wash_tips = False # keep the wash dispense tip for the first column of the following supernatant removal
 
     try:
-        [res_type,temp_mod,trash_chute,USE_GRIPPER, dry_run,mount,num_samples,heater_shaker,wash1_vol,wash2_vol,wash3_vol,sample_vol,bind_vol,bind2_vol,elution_vol] = get_values(
-        'res_type','temp_mod','trash_chute','USE_GRIPPER','dry_run','mount','num_samples','heater_shaker','wash1_vol','wash2_vol','wash3_vol','sample_vol','bind_vol','bind2_vol','elution_vol')
+        [res_type,temp_mod,trash_chute,USE_GRIPPER, dry_run,mount,num_samples,heater_shaker,wash1_vol,wash2_vol,wash3_vol,sample_vol,bind_vol,bind2_vol,elution_vol,reuse_wash_tips] = get_values(
+        'res_type','temp_mod','trash_chute','USE_GRIPPER','dry_run','mount','num_samples','heater_shaker','wash1_vol','wash2_vol','wash3_vol','sample_vol','bind_vol','bind2_vol','elution_vol','reuse_wash_tips')
     except (NameError):
         pass
 
@@ -105,7 +108,6 @@ def run(ctx):
     tips1002 = ctx.load_labware('opentrons_flex_96_tiprack_1000ul', 'B3','Tips 1')
     tips1003 = ctx.load_labware('opentrons_flex_96_tiprack_1000ul', 'A1','Tips 5')
     tips1004 = ctx.load_labware('opentrons_flex_96_tiprack_1000ul', 'B1','Tips 3')
-    tips = [*tips1000.wells(),*tips1001.wells(),*tips1002.wells(),*tips1003.wells(),*tips1004.wells()]
  
     # Load instruments
     m1000 = ctx.load_instrument('flex_8channel_1000', mount, tip_racks=[tips1000, tips1001, tips1002, tips1003, tips1004])
@@ -123,9 +125,7 @@ def run(ctx):
     samps = sample_plate.wells()[:(8*num_cols)]
     elution_samps = elutionplate.wells()[:(8*num_cols)]
 
-    colors = ['#008000','#008000','#00008B','#A52A2A','#00FFFF','#00FFFF','#800080',
-    '#ADD8E6','#FF0000','#FFFF00','#FF00FF','#7FFFD4',
-    '#FFC0CB','#FFA500','#00FF00','#C0C0C0']
+    colors = ['#008000','#008000','#00008B','#A52A2A','#00FFFF','#00FFFF','#800080'] # one per entry in liquids
 
     locations = [binding_buffer,binding_buffer,bind2_res,wash1,wash2,wash3,elution_solution]
     vols = [bead_vol,bind_vol,bind2_vol,wash1_vol,wash2_vol,wash3_vol,elution_vol]
@@ -134,13 +134,9 @@ def run(ctx):
     # Define liquids
     samples = ctx.define_liquid(name='Samples',description='Samples',display_color='#C0C0C0')
     
-    for i in samps:
-        i.load_liquid(liquid=samples,volume=0)
+    sample_plate.load_liquid(samps, volume=0, liquid=samples) # one engine call for every sample well
 
-    delete = len(colors)-len(liquids)
-    if delete>=1:
-        for i in range(delete):
-            colors.pop(-1)
+    reservoir_vol = {} # uL loaded into each reagent well, filled in by liquids_() and drawn down by pass_plan()
 
     def liquids_(liq,location,color,vol):
         sampnum = 8*(math.ceil(num_samples/8))
@@ -151,33 +147,21 @@ def run(ctx):
             extra_samples = math.ceil(1500/vol)
         
         if isinstance(location,list):
+            # Every well but the last holds a full share of samples; the last gets the remainder
             limit = sample_max/len(location)
-            iterations = math.ceil(sampnum/limit)
-            left = sampnum - limit
-            while left>limit:
-                left = left - limit
-            if left > 0:
-                last_iteration_samp_num = left
-            elif left < 0:
-                last_iteration_samp_num = sampnum
-            else:
-                last_iteration_samp_num = limit
-
-            samples_per_well = []
-            for i in range(iterations):
-                if i == (iterations-1):
-                    samples_per_well.append(last_iteration_samp_num)
-                else:
-                    samples_per_well.append(limit)
+            full_wells = math.ceil(sampnum/limit) - 1
+            samples_per_well = [limit]*full_wells + [sampnum - full_wells*limit]
 
             liq = ctx.define_liquid(name=str(liq),description=str(liq),display_color=color)
             for sample, well in zip(samples_per_well,location[:len(samples_per_well)]):
                 v = vol*(sample+extra_samples)
                 well.load_liquid(liquid=liq,volume=v)
+                reservoir_vol[well] = reservoir_vol.get(well,0) + v
         else:
             v = vol*(sampnum+extra_samples)
             liq = ctx.define_liquid(name=str(liq),description=str(liq),display_color=color)
             location.load_liquid(liquid=liq,volume=v)
+            reservoir_vol[location] = reservoir_vol.get(location,0) + v
 
     for x,(ll,l,c,v) in enumerate(zip(liquids,locations,colors,vols)):
         liquids_(ll,l,c,v)
@@ -186,24 +170,78 @@ def run(ctx):
     m1000.flow_rate.dispense = 300
     m1000.flow_rate.blow_out = 180
 
-    def tiptrack(pip, tipbox):
-        global tip1k
-        global drop_count
-        if tipbox == tips:
-            m1000.pick_up_tip(tipbox[int(tip1k)])
-            tip1k = tip1k + 8
+    def tiptrack(pip):
+        pip.pick_up_tip() # next tip column comes from the engine's tracking of tip_racks
 
-        drop_count = drop_count + 8
-        if drop_count >= 150:
-            drop_count = 0
+        state.drop_count = state.drop_count + 8
+        if state.drop_count >= 150:
+            state.drop_count = 0
             ctx.pause("Please empty the waste bin of all the tips before continuing.")
 
-    def blink():
-        for i in range(3):
-            ctx.set_rail_lights(True)
-            ctx.delay(minutes=0.01666667)
-            ctx.set_rail_lights(False)
-            ctx.delay(minutes=0.01666667)
+    PassPlan = namedtuple('PassPlan', 'src height vol_per_trans num_trans')
+
+    res_dead_vol = 1500 # uL left behind in a reservoir well
+
+    def pass_plan(vol, source, full_height=1):
+        # Per-column source well and aspirate height. Columns stay on a well until drawing another column
+        # (8 channels) would leave less than the dead volume, then move to the next; the first draw from each well
+        # starts at full_height
+        num_trans = math.ceil(vol/980)
+        vol_per_trans = vol/num_trans
+        plan = []
+        k = 0
+        first = True
+        for i in range(num_cols):
+            while k < len(source)-1 and reservoir_vol.get(source[k],0) - vol*8 < res_dead_vol:
+                k += 1
+                first = True
+            reservoir_vol[source[k]] = reservoir_vol.get(source[k],0) - vol*8
+            plan.append(PassPlan(source[k], full_height if first else 1, vol_per_trans, num_trans))
+            first = False
+        return plan
+
+    # num_samples is fixed for the run, so every pass's column plan is built once up front
+    bind_plan = pass_plan(binding_buffer_vol, binding_buffer)
+    bind_reps = [5] + [2]*(num_cols-1) # longer bead resuspension before the first column
+    bind2_plan = pass_plan(bind2_vol, bind2_res, full_height=10)
+    wash_plans = {
+        1: pass_plan(wash1_vol, wash1, full_height=10), # first draw from a full wash1 well is taken higher up
+        2: pass_plan(wash2_vol, wash2),
+        3: pass_plan(wash3_vol, wash3),
+    }
+
+    def batch_plan(plan):
+        # Consecutive columns sharing a source well are filled from one aspiration when their volumes fit (20 uL air gap on top)
+        cols_per_asp = max(1, int(960//plan[0].vol_per_trans)) if plan[0].num_trans == 1 else 1
+        batches = [] # (plan of the first column, columns)
+        for m, p in zip(samples_m, plan):
+            if batches and batches[-1][0].src == p.src and len(batches[-1][1]) < cols_per_asp:
+                batches[-1][1].append(m)
+            else:
+                batches.append((p, [m]))
+        return batches
+
+    def fill_batch(p, batch, gap_after=False):
+        # Dispense p's volume to the top of every column in batch; gap_after leaves an air gap in the empty tip
+        src = p.src
+        if len(batch) == 1:
+            for n in range(p.num_trans):
+                if m1000.current_volume > 0:
+                    m1000.dispense(m1000.current_volume, src.top())
+                m1000.aspirate(p.vol_per_trans, src.bottom(p.height))
+                m1000.air_gap(20)
+                m1000.dispense(m1000.current_volume, batch[0].top())
+                if gap_after:
+                    m1000.air_gap(20)
+            return
+        if m1000.current_volume > 0:
+            m1000.dispense(m1000.current_volume, src.top())
+        m1000.aspirate(p.vol_per_trans*len(batch), src.bottom(p.height))
+        m1000.air_gap(20)
+        for j, m in enumerate(batch):
+            m1000.dispense(p.vol_per_trans + (20 if j == 0 else 0), m.top())
+        if gap_after:
+            m1000.air_gap(20)
 
     def remove_supernatant(vol):
         ctx.comment("-----Removing Supernatant-----")
@@ -211,31 +249,28 @@ def run(ctx):
         num_trans = math.ceil(vol/980)
         vol_per_trans = vol/num_trans
 
-        def _waste_track(vol):
-            global waste_vol 
-            waste_vol = waste_vol + (vol*8)
-            if waste_vol >= 185000:
-                m1000.home()
-                blink()
-                ctx.pause('Please empty liquid waste before resuming.')
-                waste_vol = 0
-        
         for i, m in enumerate(samples_m):
-            tiptrack(m1000,tips)
+            if not m1000.has_tip: # a reused wash tip only touched clean buffer
+                tiptrack(m1000)
             loc = m.bottom(3)
             loc2 = m.bottom(1)
             for _ in range(num_trans):
                 if m1000.current_volume > 0:
                     m1000.dispense(m1000.current_volume, m.top())
                 m1000.move_to(m.center())
-                m1000.transfer(vol_per_trans, loc, waste, new_tip='never',air_gap=20)
-                m1000.blow_out(waste)
+                m1000.aspirate(vol_per_trans, loc)
                 m1000.air_gap(20)
-		
-                m1000.move_to(m.center())
-                m1000.transfer(200, loc2, waste, new_tip='never',air_gap=20)
+                m1000.dispense(m1000.current_volume, waste)
                 m1000.blow_out(waste)
                 m1000.air_gap(20)
+
+            # Single 200 uL cleanup pass at the bottom once the bulk is gone
+            if m1000.current_volume > 0:
+                m1000.dispense(m1000.current_volume, m.top())
+            m1000.aspirate(200, loc2)
+            m1000.air_gap(20)
+            m1000.dispense(m1000.current_volume, waste)
+            m1000.blow_out(waste)
             m1000.drop_tip()
         m1000.flow_rate.aspirate = 180
 
@@ -268,15 +303,20 @@ def run(ctx):
 
         pip.move_to(center)
         for _ in range(reps):
-            pip.aspirate(vol,aspbot)
-            pip.dispense(vol,distop)
-            pip.aspirate(vol,asptop)
-            pip.dispense(vol,disbot)
-            if _ == reps-1:
-                pip.flow_rate.aspirate = 150
-                pip.flow_rate.dispense = 100
+            # One cycle per rep, alternating bottom->top and top->bottom paths
+            if _ % 2 == 0:
                 pip.aspirate(vol,aspbot)
                 pip.dispense(vol,distop)
+            else:
+                pip.aspirate(vol,asptop)
+                pip.dispense(vol,disbot)
+
+        # Gentle final pass, then release what the tip retained before it leaves the well
+        pip.flow_rate.aspirate = 150
+        pip.flow_rate.dispense = 100
+        pip.aspirate(vol,aspbot)
+        pip.dispense(vol,distop)
+        pip.blow_out(well.top(-3))
 
         pip.flow_rate.aspirate = 300
         pip.flow_rate.dispense = 300
@@ -298,40 +338,33 @@ def run(ctx):
         for _ in range(reps):
             pip.aspirate(vol,asp)
             pip.dispense(vol,disp)
-            pip.aspirate(vol,asp)
-            pip.dispense(vol,disp)
-            if _ == reps-1:
-                pip.flow_rate.aspirate = 150
-                pip.flow_rate.dispense = 100
-                pip.aspirate(vol,asp)
-                pip.dispense(vol,disp)
+
+        # Gentle final pass, then release what the tip retained before it leaves the well
+        pip.flow_rate.aspirate = 150
+        pip.flow_rate.dispense = 100
+        pip.aspirate(vol,asp)
+        pip.dispense(vol,disp)
+        pip.blow_out(well.top(-3))
 
         pip.flow_rate.aspirate = 300
         pip.flow_rate.dispense = 300
 
     def bind(vol1,vol2):
         ctx.comment('-----Beginning Binding Steps-----')
-        for i, well in enumerate(samples_m):
-            tiptrack(m1000,tips)
-            num_trans = math.ceil(vol1/980)
-            vol_per_trans = vol1/num_trans
-            source = binding_buffer[i//2]
-            if i == 0:
-                reps=5
-            else:
-                reps=2
-            bead_mixing(source,m1000,vol_per_trans,reps=reps if not dry_run else 1)
-            
-            for t in range(num_trans):
-                if m1000.current_volume > 0:
-                    m1000.dispense(m1000.current_volume, source.top())
-                m1000.transfer(vol_per_trans, source, well.top(), air_gap=20,new_tip='never')
+        c = 0
+        for plan, batch in batch_plan(bind_plan):
+            tiptrack(m1000)
+            bead_mixing(plan.src,m1000,plan.vol_per_trans,reps=bind_reps[c] if not dry_run else 1)
+            fill_batch(plan, batch, gap_after=True)
+
+            # Only the first column's tip touched the reservoir; the rest of the batch gets its own mixing tip
+            for j, well in enumerate(batch):
+                if j != 0:
+                    tiptrack(m1000)
+                mixing(well,m1000,plan.vol_per_trans,reps=8 if not dry_run else 1)
                 m1000.air_gap(20)
-            
-            mixing(well,m1000,vol_per_trans,reps=8 if not dry_run else 1)
-            m1000.blow_out()
-            m1000.air_gap(20)
-            m1000.drop_tip()
+                m1000.drop_tip()
+            c += len(batch)
                        
         if heater_shaker:
             h_s.set_and_wait_for_shake_speed(1800)
@@ -353,33 +386,21 @@ def run(ctx):
         if heater_shaker:
             h_s.close_labware_latch()
 
-        for bindi in np.arange(settling_time_binding+1,0,-0.5):
-            ctx.delay(minutes=0.5, msg='There are ' + str(bindi) + ' minutes left in the incubation.')
+        ctx.delay(minutes=settling_time_binding+1, msg='Incubating on MagDeck for ' + str(settling_time_binding+1) + ' minutes.')
 
         # Remove initial supernatant
         remove_supernatant(vol1+starting_vol)
 
+        # remove_supernatant() has already put the plate back on the H-S, so bind #2 is dispensed off the magnet
         ctx.comment('-----Beginning Bind #2 Steps-----')
-        tiptrack(m1000,tips)
-        for i, well in enumerate(samples_m):
-            num_trans = math.ceil(vol2/980)
-            vol_per_trans = vol2/num_trans
-            source = bind2_res[i//3]
-            if i == 0 or i == 3:
-                height = 10
-            else:
-                height = 1
-            
-            for t in range(num_trans):
-                if m1000.current_volume > 0:
-                    m1000.dispense(m1000.current_volume, source.top())
-                m1000.transfer(vol_per_trans, source.bottom(height), well.top(), air_gap=20,new_tip='never')
-                m1000.air_gap(20)
+        tiptrack(m1000)
+        for plan, batch in batch_plan(bind2_plan):
+            fill_batch(plan, batch, gap_after=True)
 
-        for i in range(num_cols):
+        for i, plan in enumerate(bind2_plan):
             if i != 0:
-                tiptrack(m1000,tips)
-            mixing(samples_m[i],m1000,vol_per_trans,reps=8 if not dry_run else 1)
+                tiptrack(m1000)
+            mixing(samples_m[i],m1000,plan.vol_per_trans,reps=8 if not dry_run else 1)
             m1000.drop_tip()
 
         if heater_shaker:
@@ -402,45 +423,26 @@ def run(ctx):
         if heater_shaker:
             h_s.close_labware_latch()
 
-        for bindi in np.arange(settling_time_wash+1,0,-0.5):
-            ctx.delay(minutes=0.5, msg='There are ' + str(bindi) + ' minutes left in the incubation.')
+        ctx.delay(minutes=settling_time_wash+1, msg='Incubating on MagDeck for ' + str(settling_time_wash+1) + ' minutes.')
 
         # Remove initial supernatant
         remove_supernatant(vol2+25)
 
     def wash(vol, source):
-        global whichwash
-
         if source == wash1:
-            whichwash = 1
-            const = 6//len(source)
+            state.whichwash = 1
         if source == wash2:
-            whichwash = 2
-            const = 6//len(source)
-            height = 1
+            state.whichwash = 2
         if source == wash3:
-            whichwash = 3
-            const = 6//len(source)
-            height = 1
+            state.whichwash = 3
 
-        ctx.comment("-----Wash #" + str(whichwash) + " is starting now------")
+        ctx.comment("-----Wash #" + str(state.whichwash) + " is starting now------")
 
-        num_trans = math.ceil(vol/980)
-        vol_per_trans = vol/num_trans
-        
-        tiptrack(m1000,tips)
-        for i, m in enumerate(samples_m):
-            if source == wash1:
-                if i == 0 or i == 3:
-                    height = 10
-                else:
-                    height = 1
-            src = source[i//const]
-            for n in range(num_trans):
-                if m1000.current_volume > 0:
-                    m1000.dispense(m1000.current_volume, src.top())
-                m1000.transfer(vol_per_trans, src.bottom(height), m.top(), air_gap=20,new_tip='never')
-        m1000.drop_tip() 
+        tiptrack(m1000)
+        for p, batch in batch_plan(wash_plans[state.whichwash]):
+            fill_batch(p, batch)
+        if not reuse_wash_tips:
+            m1000.drop_tip()
 
         if heater_shaker:
             h_s.set_and_wait_for_shake_speed(1800)
@@ -462,13 +464,12 @@ def run(ctx):
         if heater_shaker:
             h_s.close_labware_latch()
 
-        for washi in np.arange(settling_time_wash,0,-0.5):
-            ctx.delay(minutes=0.5, msg='There are ' + str(washi) + ' minutes left in wash ' + str(whichwash) + ' incubation.')
+        ctx.delay(minutes=settling_time_wash, msg='Wash ' + str(state.whichwash) + ' incubation on MagDeck for ' + str(settling_time_wash) + ' minutes.')
 
         remove_supernatant(vol)
 
     def elute(vol):
-        tiptrack(m1000,tips)
+        tiptrack(m1000)
         for i, m in enumerate(samples_m):
             m1000.aspirate(vol, elution_solution)
             m1000.air_gap(5)
@@ -495,14 +496,15 @@ def run(ctx):
         if heater_shaker:
             h_s.close_labware_latch()
 
-        for elutei in np.arange(settling_time,0,-0.5):
-            ctx.delay(minutes=0.5, msg='Incubating on MagDeck for ' + str(elutei) + ' more minutes.') 
+        ctx.delay(minutes=settling_time, msg='Incubating on MagDeck for ' + str(settling_time) + ' minutes.')
 
         for i, (m, e) in enumerate(zip(samples_m, elution_samples_m)):
-            tiptrack(m1000,tips)
+            tiptrack(m1000)
             m1000.flow_rate.dispense = 100
             m1000.flow_rate.aspirate = 25
-            m1000.transfer(vol, m.bottom(0.3), e.bottom(5), air_gap=5, new_tip='never')
+            m1000.aspirate(vol, m.bottom(0.3))
+            m1000.air_gap(5)
+            m1000.dispense(m1000.current_volume, e.bottom(5))
             m1000.blow_out(e.top(-2))
             m1000.air_gap(5)
             m1000.drop_tip()
@@ -520,8 +522,7 @@ def run(ctx):
             h_s.set_and_wait_for_temperature(55)
     else:
         drybeads = 0.5
-    for beaddry in np.arange(drybeads,0,-0.5):
-        ctx.delay(minutes=0.5, msg='There are ' + str(beaddry) + ' minutes left in the drying step.')
+    ctx.delay(minutes=drybeads, msg='Drying beads for ' + str(drybeads) + ' minutes.')
     elute(elution_vol)
     if heater_shaker:
         h_s.deactivate_heater()
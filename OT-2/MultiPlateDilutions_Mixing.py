@@ -1,7 +1,6 @@
 ## MULTIPLE PLATE DILUTIONS V6 - WITH VOLUME SPLITTING
 
 from opentrons import protocol_api
-import math
 
 metadata = {
     'protocolName': 'Multiple Plate Dilutions V6: with sample mixing',
@@ -15,6 +14,55 @@ requirements = {
     'apiLevel': '2.22'
 }
 
+# 50 µL moved from each large-dilution reservoir tube to the plate: (µL, dispense rate) per pass,
+# slow first so the empty destination well isn't splashed
+TRANSFER_50 = ((19, 0.3), (19, 0.7), (12, 1.0))
+
+# Per-row progress comments; off by default to keep the run log short
+VERBOSE = False
+
+WATER_TUBE_CAPACITY = 1500  # µL per water tube
+
+# 24-tube rack well names in column-first order; the rack has 4 rows (A-D) and 6 columns (1-6)
+WELL_NAMES_COLUMN_ORDER = (
+    'A1', 'B1', 'C1', 'D1', 'A2', 'B2', 'C2', 'D2', 'A3', 'B3', 'C3', 'D3',
+    'A4', 'B4', 'C4', 'D4', 'A5', 'B5', 'C5', 'D5', 'A6', 'B6', 'C6', 'D6'
+)
+
+def _ceil_div(a, b):
+    # Integer ceiling of a / b
+    return int(-(-a // b))
+
+def _fast_int(value):
+    # Plate numbers are normally plain digits; only fall back to float parsing for values like '1.0'
+    return int(value) if value.isdigit() else int(float(value))
+
+class DilutionRow:
+    # One parsed CSV row; slots keep the per-row records small and attribute access cheap
+    __slots__ = ('source_plate', 'source_well', 'destination_plate', 'destination_well',
+                 'sample_volume', 'water_volume', 'initial_sample_volume', 'final_volume',
+                 'mix_before_volume', 'mix_after_volume', 'transfer_plan', 'reservoir_tube',
+                 'source_well_obj', 'dest_well_obj', 'source_bottom', 'dest_bottom', 'dest_mix',
+                 'dest_blowout', 'dest_top', 'reservoir_bottom', 'reservoir_mix', 'water_transfers',
+                 'needs_mix_before')
+
+    def __init__(self, source_plate, source_well, destination_plate, destination_well,
+                 sample_volume, water_volume, initial_sample_volume):
+        self.source_plate = source_plate
+        self.source_well = source_well
+        self.destination_plate = destination_plate
+        self.destination_well = destination_well
+        self.sample_volume = sample_volume
+        self.water_volume = water_volume
+        self.initial_sample_volume = initial_sample_volume
+        self.final_volume = sample_volume + water_volume
+        # Mix volumes only depend on the CSV values, so they are worked out once here
+        self.mix_before_volume = min(initial_sample_volume * 0.8, 20)
+        self.mix_after_volume = min(self.final_volume * 0.8, 20)
+        # Sample volume split into P20 transfers: 19 µL each, remainder last
+        num_transfers = _ceil_div(sample_volume, 19) if sample_volume > 19 else 1
+        self.transfer_plan = (19,) * (num_transfers - 1) + (sample_volume - 19 * (num_transfers - 1),)
+
 def add_parameters(parameters):
     parameters.add_csv_file(
         variable_name="multiple_plate_dilution_data",
@@ -42,58 +90,48 @@ def add_parameters(parameters):
     )
 
 def run(protocol: protocol_api.ProtocolContext):
+    def banner(msg):
+        protocol.comment(f"=== {msg} ===")
+    
     # Access runtime parameters
     num_source_plates = protocol.params.num_source_plates
     num_destination_plates = protocol.params.num_destination_plates
     
     # Parse CSV data
     csv_data = protocol.params.multiple_plate_dilution_data.parse_as_csv()
-    csv_rows = list(csv_data)
-    headers = csv_rows[0]
+    csv_rows = iter(csv_data)
+    headers = next(csv_rows, None)
     
-    # Process CSV and create data structure
-    well_data = []
-    for row in csv_rows[1:]:
-        try:
-            well_data.append({
-                'source_plate': int(float(row[0])),
-                'source_well': str(row[1]).strip(),
-                'destination_plate': int(float(row[2])),
-                'destination_well': str(row[3]).strip(),
-                'sample_volume': float(row[4]),
-                'water_volume': float(row[5]),
-                'initial_sample_volume': float(row[6])
-            })
-        except (ValueError, IndexError) as e:
-            protocol.comment(f"Error parsing row: {row}")
-            raise ValueError(f"CSV parsing error: {str(e)}")
-
-    protocol.comment(f"Successfully parsed {len(well_data)} rows from CSV")
-
     # ============================================================================
-    # VALIDATION SECTION
+    # PARSING AND VALIDATION SECTION
     # ============================================================================
-    protocol.comment("=" * 60)
-    protocol.comment("VALIDATION: Checking CSV data against loaded plates")
-    protocol.comment("=" * 60)
+    banner("VALIDATION: Checking CSV data against loaded plates")
     
+    # Each CSV row is parsed, validated and categorized in a single pass
+    well_data = []
     validation_errors = []
-    required_source_plates = set()
-    required_destination_plates = set()
+    # Bit n set = plate n is used; invalid plate numbers are reported as validation errors instead
+    source_plate_mask = 0
+    destination_plate_mask = 0
     
     # Categorize wells by dilution type
-    wells_normal = []  # Final volume ≤ 200 µL
     wells_large_dilution = []  # Final volume > 200 µL (need reservoir prep)
+    wells_water_first = []  # Final volume ≤ 200 µL, water ≥5 µL goes in before the sample
+    wells_water_after = []  # Final volume ≤ 200 µL, water <5 µL goes in after the sample
+    total_water_normal = 0
+    total_water_large = 0
     
-    for idx, row in enumerate(well_data):
-        row_number = idx + 2
-        
-        source_plate_num = row['source_plate']
-        dest_plate_num = row['destination_plate']
-        final_volume = row['sample_volume'] + row['water_volume']
+    for row_number, csv_row in enumerate(csv_rows, start=2):
+        try:
+            sp, sw, dp, dw, sv, wv, isv = csv_row[:7]
+            row = DilutionRow(_fast_int(sp), sw.strip(), _fast_int(dp), dw.strip(), float(sv), float(wv), float(isv))
+        except (ValueError, IndexError) as e:
+            protocol.comment(f"Error parsing row: {csv_row}")
+            raise ValueError(f"CSV parsing error: {str(e)}")
+        well_data.append(row)
         
-        required_source_plates.add(source_plate_num)
-        required_destination_plates.add(dest_plate_num)
+        source_plate_num = row.source_plate
+        dest_plate_num = row.destination_plate
         
         # Validate plate numbers
         if source_plate_num < 1 or source_plate_num > num_source_plates:
@@ -101,34 +139,44 @@ def run(protocol: protocol_api.ProtocolContext):
                 f"Row {row_number}: Source plate {source_plate_num} invalid. "
                 f"Must be 1-{num_source_plates}."
             )
+        else:
+            source_plate_mask |= 1 << source_plate_num
         
         if dest_plate_num < 1 or dest_plate_num > num_destination_plates:
             validation_errors.append(
                 f"Row {row_number}: Dest plate {dest_plate_num} invalid. "
                 f"Must be 1-{num_destination_plates}."
             )
+        else:
+            destination_plate_mask |= 1 << dest_plate_num
         
         # Validate volumes
-        if row['sample_volume'] <= 0:
+        if row.sample_volume <= 0:
             validation_errors.append(f"Row {row_number}: Sample volume must be > 0")
         
-        if row['water_volume'] < 0:
+        if row.water_volume < 0:
             validation_errors.append(f"Row {row_number}: Water volume cannot be negative")
         
-        if row['initial_sample_volume'] <= 0:
+        if row.initial_sample_volume <= 0:
             validation_errors.append(f"Row {row_number}: Initial sample volume must be > 0")
         
-        # Categorize by final volume
-        if final_volume > 200:
+        # Categorize by final volume, then normal wells by water volume
+        if row.final_volume > 200:
             wells_large_dilution.append(row)
+            total_water_large += row.water_volume
         else:
-            wells_normal.append(row)
+            if row.water_volume >= 5:
+                wells_water_first.append(row)
+            else:
+                wells_water_after.append(row)
+            total_water_normal += row.water_volume
     
     # Display validation summary
     protocol.comment("-" * 60)
-    protocol.comment(f"Source plates required: {sorted(required_source_plates)}")
-    protocol.comment(f"Destination plates required: {sorted(required_destination_plates)}")
-    protocol.comment(f"Normal dilutions (≤200 µL): {len(wells_normal)}")
+    protocol.comment(f"Successfully parsed {len(well_data)} rows from CSV")
+    protocol.comment(f"Source plates required: {[n for n in range(1, num_source_plates + 1) if source_plate_mask >> n & 1]}")
+    protocol.comment(f"Destination plates required: {[n for n in range(1, num_destination_plates + 1) if destination_plate_mask >> n & 1]}")
+    protocol.comment(f"Normal dilutions (≤200 µL): {len(wells_water_first) + len(wells_water_after)}")
     protocol.comment(f"Large dilutions (>200 µL): {len(wells_large_dilution)}")
     protocol.comment("-" * 60)
     
@@ -138,15 +186,20 @@ def run(protocol: protocol_api.ProtocolContext):
             protocol.comment(error)
         raise ValueError(f"CSV validation failed with {len(validation_errors)} error(s)")
     
+    # Work through wells plate by plate, column by column, so the head doesn't zig-zag across the deck
+    def plate_order(plate, well_name):
+        return (plate, int(well_name[1:]), well_name[0])
+    
+    wells_large_dilution.sort(key=lambda row: plate_order(row.source_plate, row.source_well))
+    wells_water_first.sort(key=lambda row: plate_order(row.destination_plate, row.destination_well))
+    wells_water_after.sort(key=lambda row: plate_order(row.destination_plate, row.destination_well))
+    
     # Calculate total water needed and number of water tubes required
-    total_water_normal = sum(row['water_volume'] for row in wells_normal)
-    total_water_large = sum(row['water_volume'] for row in wells_large_dilution)
     total_water = total_water_normal + total_water_large
     total_water_with_buffer = total_water + 50
     
     # Calculate number of water tubes needed (1500 µL capacity per tube)
-    WATER_TUBE_CAPACITY = 1500  # µL
-    num_water_tubes = math.ceil(total_water_with_buffer / WATER_TUBE_CAPACITY)
+    num_water_tubes = _ceil_div(total_water_with_buffer, WATER_TUBE_CAPACITY)
     
     # Calculate reservoir tubes needed for large dilutions
     num_reservoir_tubes_needed = len(wells_large_dilution)
@@ -173,40 +226,27 @@ def run(protocol: protocol_api.ProtocolContext):
         'Water Reservoir & Large Dilution Prep'
     )
     
-    # Get well names in column-first order (A1, B1, C1, D1, A2, B2, C2, D2, ...)
-    # The 24-tube rack has 4 rows (A-D) and 6 columns (1-6)
-    well_names_column_order = []
-    for col in range(1, 7):  # Columns 1-6
-        for row in ['A', 'B', 'C', 'D']:  # Rows A-D
-            well_names_column_order.append(f"{row}{col}")
-    
-    protocol.comment("=" * 60)
-    protocol.comment("WATER TUBE CALCULATION")
-    protocol.comment("=" * 60)
+    banner("WATER TUBE CALCULATION")
     protocol.comment(f"Total water needed: {total_water:.1f} µL")
     protocol.comment(f"With buffer: {total_water_with_buffer:.1f} µL")
     protocol.comment(f"Water tubes required: {num_water_tubes}")
     protocol.comment(f"Water tube capacity: {WATER_TUBE_CAPACITY} µL each")
     if num_water_tubes > 1:
-        water_tube_names = [well_names_column_order[i] for i in range(num_water_tubes)]
+        water_tube_names = WELL_NAMES_COLUMN_ORDER[:num_water_tubes]
         protocol.comment(f"Please load {num_water_tubes} tubes with water in positions: {', '.join(water_tube_names)}")
     else:
         protocol.comment("Please load 1 tube with water in position A1")
-    protocol.comment("=" * 60)
+    
+    # Each large dilution keeps the same reservoir tube in Step 1A and Step 2
+    for idx, row in enumerate(wells_large_dilution):
+        row.reservoir_tube = water_reservoir[WELL_NAMES_COLUMN_ORDER[dilution_tube_start_index + idx]]
     
     if num_reservoir_tubes_needed > 0:
-        dilution_tube_names = [well_names_column_order[i] for i in range(dilution_tube_start_index, dilution_tube_start_index + num_reservoir_tubes_needed)]
-        protocol.comment("=" * 60)
-        protocol.comment("LARGE DILUTION SETUP REQUIRED")
-        protocol.comment("=" * 60)
+        dilution_tube_names = [row.reservoir_tube.well_name for row in wells_large_dilution]
+        banner("LARGE DILUTION SETUP REQUIRED")
         protocol.comment(f"Number of dilution tubes needed: {num_reservoir_tubes_needed}")
         protocol.comment(f"Dilution tubes will be in positions: {', '.join(dilution_tube_names)}")
         protocol.comment("Please ensure water reservoir has sufficient empty tubes loaded")
-        protocol.comment("=" * 60)
-    
-    # Further categorize normal wells by water volume
-    wells_water_first = [row for row in wells_normal if row['water_volume'] >= 5]
-    wells_water_after = [row for row in wells_normal if row['water_volume'] < 5]
     
     protocol.comment(f"Normal dilutions - water first (≥5 µL): {len(wells_water_first)}")
     protocol.comment(f"Normal dilutions - water after (<5 µL): {len(wells_water_after)}")
@@ -230,18 +270,15 @@ def run(protocol: protocol_api.ProtocolContext):
     total_tips_needed += len(wells_water_after) * 2
     
     tips_per_rack = 96
-    tip_racks_needed = math.ceil(total_tips_needed / tips_per_rack)
+    tip_racks_needed = _ceil_div(total_tips_needed, tips_per_rack)
     
-    protocol.comment("=" * 60)
-    protocol.comment("TIP USAGE CALCULATION")
-    protocol.comment("=" * 60)
+    banner("TIP USAGE CALCULATION")
     protocol.comment(f"Total tips needed: {total_tips_needed}")
     protocol.comment(f"Tip racks required: {tip_racks_needed}")
     if tip_racks_needed == 1:
         protocol.comment("You only need 1 tip rack for this protocol")
     else:
         protocol.comment(f"You need {tip_racks_needed} tip racks for this protocol")
-    protocol.comment("=" * 60)
     
     # Load source plates
     source_plates = {}
@@ -275,9 +312,40 @@ def run(protocol: protocol_api.ProtocolContext):
         'right', 
         tip_racks=[tips_20_1, tips_20_2]
     )
+    # Bound once: the steps below call these for every well
+    aspirate = p20_single.aspirate
+    dispense = p20_single.dispense
+    air_gap = p20_single.air_gap
+    blow_out = p20_single.blow_out
+    mix = p20_single.mix
+    touch_tip = p20_single.touch_tip
+    pick_up_tip = p20_single.pick_up_tip
+    drop_tip = p20_single.drop_tip
+
+    # Resolve every row's source and destination Well once the plates are on the deck,
+    # along with the pipetting locations the steps use on them (nothing moves on an OT-2)
+    for row in well_data:
+        row.source_well_obj = source_plates[row.source_plate][row.source_well]
+        row.dest_well_obj = destination_plates[row.destination_plate][row.destination_well]
+        row.source_bottom = row.source_well_obj.bottom(z=0.5)
+        row.dest_bottom = row.dest_well_obj.bottom(z=1)
+        row.dest_mix = row.dest_well_obj.bottom(z=0.5)
+        row.dest_blowout = row.dest_well_obj.bottom(z=2)
+        row.dest_top = row.dest_well_obj.top(z=-2)
+    for row in wells_large_dilution:
+        row.reservoir_bottom = row.reservoir_tube.bottom(z=1)
+        row.reservoir_mix = row.reservoir_tube.bottom(z=0.5)
+    
+    # A source well drawn from by back-to-back rows of a step is only resuspended on the first of them;
+    # once another source is visited in between it has had time to settle and is mixed again
+    for step_rows in (wells_large_dilution, wells_water_first, wells_water_after):
+        previous_source = None
+        for row in step_rows:
+            row.needs_mix_before = row.source_well_obj is not previous_source
+            previous_source = row.source_well_obj
 
     # Define water wells using column-first order
-    water_wells = [water_reservoir[well_names_column_order[i]] for i in range(num_water_tubes)]
+    water_wells = [water_reservoir[name] for name in WELL_NAMES_COLUMN_ORDER[:num_water_tubes]]
 
     # Define and load liquids
     water = protocol.define_liquid(
@@ -291,207 +359,163 @@ def run(protocol: protocol_api.ProtocolContext):
     for water_well in water_wells:
         water_well.load_liquid(liquid=water, volume=water_per_tube)
     
-    protocol.comment("=" * 60)
-    protocol.comment("STARTING PROTOCOL")
-    protocol.comment("=" * 60)
+    # Plan every water transfer up front, in the order Steps 1A, 1B and 5 run, so each row carries
+    # its (water tube Well, µL) list and running out of water fails here rather than mid-run
+    water_tube_index = 0
+    water_left_in_tube = water_per_tube
+    for row in wells_large_dilution + wells_water_first + wells_water_after:
+        row.water_transfers = []
+        water_vol_remaining = row.water_volume
+        while water_vol_remaining > 0:
+            # Check if we need to switch to next water tube; only done once per tube segment
+            if water_left_in_tube < 1:
+                water_tube_index += 1
+                if water_tube_index >= num_water_tubes:
+                    raise ValueError("Ran out of water tubes while planning water transfers")
+                water_left_in_tube = water_per_tube
+            
+            # Everything the current tube gives towards this well; a <0.5 µL
+            # leftover rides along rather than needing its own pass
+            segment = min(water_vol_remaining, water_left_in_tube)
+            if water_vol_remaining - segment < 0.5:
+                segment = water_vol_remaining
+            water_vol_remaining -= segment
+            water_left_in_tube -= segment
+            
+            while segment > 0:
+                # ≤19 µL per transfer, again folding a <0.5 µL leftover in (still ≤20 µL with the air gap)
+                transfer_vol = min(segment, 19)
+                if segment - transfer_vol < 0.5:
+                    transfer_vol = segment
+                segment -= transfer_vol
+                row.water_transfers.append((water_wells[water_tube_index], transfer_vol))
+    
+    def dispense_water(target_well, water_transfers, dispense_rate, use_touch_tip=True, mix_after_volume=None):
+        # Run a row's planned water transfers into target_well with the tip already on the pipette
+        target_bottom = target_well.bottom(z=1)
+        target_blowout = target_well.bottom(z=2)
+        target_top = target_well.top(z=-2)
+        last_transfer = len(water_transfers) - 1
+        
+        for i, (water_well, transfer_vol) in enumerate(water_transfers):
+            aspirate(transfer_vol, water_well)
+            air_gap(0.5)
+            dispense(transfer_vol + 0.5, target_bottom, rate=dispense_rate)
+            
+            # Mix after only on last transfer
+            if mix_after_volume is not None and i == last_transfer:
+                mix(9, mix_after_volume, target_well.bottom(z=0.5))
+                aspirate(mix_after_volume, target_bottom)
+                dispense(mix_after_volume, target_bottom, rate=0.5)
+            
+            blow_out(target_blowout)
+            if use_touch_tip:
+                touch_tip(target_well, v_offset=-5, speed=10)
+            blow_out(target_top)
+    
+    banner("STARTING PROTOCOL")
    
     # ============================================================================
     # STEP 1: Add ALL water to reservoir tubes (for large dilutions)
     # ============================================================================
     if wells_large_dilution:
-        protocol.comment("=" * 60)
-        protocol.comment(f"STEP 1A: Adding water to {len(wells_large_dilution)} reservoir tubes")
-        protocol.comment("=" * 60)
+        banner(f"STEP 1A: Adding water to {len(wells_large_dilution)} reservoir tubes")
         
         # Pick up ONE tip for all reservoir water additions
-        p20_single.pick_up_tip()
-        
-        # Track water usage across multiple water tubes
-        current_water_tube_index = 0
-        water_remaining_in_current_tube = water_per_tube
+        pick_up_tip()
         
         # Add water to all reservoir tubes
         for idx, row in enumerate(wells_large_dilution):
-            # Use tubes starting after water tubes (in column-first order)
-            tube_index = dilution_tube_start_index + idx
-            reservoir_tube = water_reservoir[well_names_column_order[tube_index]]
+            reservoir_tube = row.reservoir_tube
             
-            final_volume = row['sample_volume'] + row['water_volume']
-            
-            protocol.comment(f"Adding water to reservoir tube {idx + 1}/{len(wells_large_dilution)}")
-            protocol.comment(f"  Final volume: {final_volume:.1f} µL in tube {reservoir_tube.well_name}")
+            if VERBOSE:
+                protocol.comment(f"Adding water to reservoir tube {idx + 1}/{len(wells_large_dilution)}")
+                protocol.comment(f"  Final volume: {row.final_volume:.1f} µL in tube {reservoir_tube.well_name}")
             
             # Add water to reservoir tube (split if needed)
-            water_vol = row['water_volume']
-            water_vol_remaining = water_vol
-
-            while water_vol_remaining > 0:
-                # Check if we need to switch to next water tube
-                if water_remaining_in_current_tube < 1:
-                    current_water_tube_index += 1
-                    if current_water_tube_index >= num_water_tubes:
-                        raise ValueError("Ran out of water tubes during protocol execution")
-                    water_remaining_in_current_tube = water_per_tube
-                
-                # Determine how much to transfer from current water tube
-                transfer_vol = min(water_vol_remaining, water_remaining_in_current_tube, 19)
-                
-                current_water_well = water_wells[current_water_tube_index]
-                
-                p20_single.aspirate(transfer_vol, current_water_well)
-                if transfer_vol >= 0.5:
-                    p20_single.air_gap(0.5)
-                    p20_single.dispense(transfer_vol + 0.5, reservoir_tube.bottom(z=1), rate=0.9)
-                else:
-                    p20_single.dispense(transfer_vol, reservoir_tube.bottom(z=1), rate=0.9)
-                p20_single.blow_out(reservoir_tube.bottom(z=2))
-                p20_single.blow_out(reservoir_tube.top(z=-2))
-                
-                water_vol_remaining -= transfer_vol
-                water_remaining_in_current_tube -= transfer_vol
+            dispense_water(reservoir_tube, row.water_transfers, 0.9, use_touch_tip=False)
 
         # Drop the tip after all reservoir water additions
-        p20_single.drop_tip()
+        drop_tip()
         protocol.comment("Reservoir water additions complete")
 
     # ============================================================================
     # STEP 2: Add ALL water to destination plates (for normal dilutions with water ≥5 µL)
     # ============================================================================
     if wells_water_first:
-        protocol.comment("=" * 60)
-        protocol.comment(f"STEP 1B: Adding water to {len(wells_water_first)} destination plate wells")
-        protocol.comment("=" * 60)
+        banner(f"STEP 1B: Adding water to {len(wells_water_first)} destination plate wells")
         
         # Pick up ONE tip for all plate water additions
-        p20_single.pick_up_tip()
+        pick_up_tip()
         
-        # Track water usage across multiple water tubes
-        current_water_tube_index = 0
-        water_remaining_in_current_tube = water_per_tube
-
         for row in wells_water_first:
-            destination_plate = destination_plates[row['destination_plate']]
-            dest_well = destination_plate[row['destination_well']]
-            water_vol = row['water_volume']
-            water_vol_remaining = water_vol
-            
-            while water_vol_remaining > 0:
-                # Check if we need to switch to next water tube
-                if water_remaining_in_current_tube < 1:
-                    current_water_tube_index += 1
-                    if current_water_tube_index >= num_water_tubes:
-                        raise ValueError("Ran out of water tubes during protocol execution")
-                    water_remaining_in_current_tube = water_per_tube
-                
-                # Determine how much to transfer from current water tube
-                transfer_vol = min(water_vol_remaining, water_remaining_in_current_tube, 19)
-                
-                current_water_well = water_wells[current_water_tube_index]
-                
-                p20_single.aspirate(transfer_vol, current_water_well)
-                if transfer_vol >= 0.5:
-                    p20_single.air_gap(0.5)
-                    p20_single.dispense(transfer_vol + 0.5, dest_well.bottom(z=1), rate=0.3)
-                else:
-                    p20_single.dispense(transfer_vol, dest_well.bottom(z=1), rate=0.3)
-                p20_single.blow_out(dest_well.bottom(z=2))
-                p20_single.touch_tip(dest_well, v_offset=-5, speed=10)
-                p20_single.blow_out(dest_well.top(z=-2))
-                
-                water_vol_remaining -= transfer_vol
-                water_remaining_in_current_tube -= transfer_vol
+            dest_well = row.dest_well_obj
+            dispense_water(dest_well, row.water_transfers, 0.3)
 
         # Drop the tip after all plate water additions
-        p20_single.drop_tip()
+        drop_tip()
         protocol.comment("Plate water additions complete")
 
     # ============================================================================
     # STEP 3: Add samples to reservoir tubes and transfer to destination (large dilutions)
     # ============================================================================
     if wells_large_dilution:
-        protocol.comment("=" * 60)
-        protocol.comment(f"STEP 2: Processing {len(wells_large_dilution)} large dilutions")
-        protocol.comment("=" * 60)
+        banner(f"STEP 2: Processing {len(wells_large_dilution)} large dilutions")
         
         # Now add samples, mix, and transfer 50µL - all with ONE tip per dilution
         for idx, row in enumerate(wells_large_dilution):
-            tube_index = dilution_tube_start_index + idx
-            reservoir_tube = water_reservoir[well_names_column_order[tube_index]]
-            
-            source_plate = source_plates[row['source_plate']]
-            source_well = source_plate[row['source_well']]
-            
-            destination_plate = destination_plates[row['destination_plate']]
-            dest_well = destination_plate[row['destination_well']]
-            
-            final_volume = row['sample_volume'] + row['water_volume']
-            
-            protocol.comment(f"Processing dilution {idx + 1}/{len(wells_large_dilution)}")
+            if VERBOSE:
+                protocol.comment(f"Processing dilution {idx + 1}/{len(wells_large_dilution)}")
             
             # Pick up ONE tip for this entire dilution (sample + mix + transfer)
-            p20_single.pick_up_tip()
+            pick_up_tip()
             
             # Add sample to reservoir tube (split if needed)
-            sample_vol = row['sample_volume']
-            mix_before_volume = min(row['initial_sample_volume'] * 0.8, 20)
-            mix_after_volume = min(final_volume * 0.8, 20)
+            sample_vol = row.sample_volume
+            mix_before_volume = row.mix_before_volume
+            mix_after_volume = row.mix_after_volume
 
             if sample_vol > 19:
-                num_transfers = math.ceil(sample_vol / 19)
-                for i in range(num_transfers):
-                    if i == num_transfers - 1:
-                        transfer_vol = sample_vol - (i * 19)
-                    else:
-                        transfer_vol = 19
-                    
+                last_transfer = len(row.transfer_plan) - 1
+                for i, transfer_vol in enumerate(row.transfer_plan):
                     # Mix sample before only on first transfer
-                    if i == 0:
-                        p20_single.mix(10, mix_before_volume, source_well.bottom(z=0.5))
+                    if i == 0 and row.needs_mix_before:
+                        mix(10, mix_before_volume, row.source_bottom)
                     
-                    p20_single.aspirate(transfer_vol, source_well.bottom(z=0.5))
+                    aspirate(transfer_vol, row.source_bottom)
                     if transfer_vol >= 0.5:
-                        p20_single.air_gap(0.5)
-                        p20_single.dispense(transfer_vol + 0.5, reservoir_tube.bottom(z=1))
+                        air_gap(0.5)
+                        dispense(transfer_vol + 0.5, row.reservoir_bottom)
                     else:
-                        p20_single.dispense(transfer_vol, reservoir_tube.bottom(z=1))
+                        dispense(transfer_vol, row.reservoir_bottom)
                     
                     # Mix sample + water only after the last transfer
-                    if i == num_transfers - 1:
-                        p20_single.mix(10, mix_after_volume, reservoir_tube.bottom(z=0.5))
+                    if i == last_transfer:
+                        mix(10, mix_after_volume, row.reservoir_mix)
         
             else:
-                p20_single.mix(10, mix_before_volume, source_well.bottom(z=0.5))
-                p20_single.aspirate(sample_vol, source_well.bottom(z=0.5))
+                if row.needs_mix_before:
+                    mix(10, mix_before_volume, row.source_bottom)
+                aspirate(sample_vol, row.source_bottom)
                 if sample_vol >= 0.5:
-                    p20_single.air_gap(0.5)
-                    p20_single.dispense(sample_vol + 0.5, reservoir_tube.bottom(z=1))
+                    air_gap(0.5)
+                    dispense(sample_vol + 0.5, row.reservoir_bottom)
                 else:
-                    p20_single.dispense(sample_vol, reservoir_tube.bottom(z=1))
-                p20_single.mix(10, mix_after_volume, reservoir_tube.bottom(z=0.5))
+                    dispense(sample_vol, row.reservoir_bottom)
+                mix(10, mix_after_volume, row.reservoir_mix)
             
             # Transfer 50 µL from reservoir tube to destination plate (using same tip)
-            protocol.comment(f"  Transferring 50 µL to destination {row['destination_well']}")
-            
-            # First 19 µL
-            p20_single.aspirate(19, reservoir_tube.bottom(z=0.5))
-            p20_single.air_gap(0.5)
-            p20_single.dispense(19.5, dest_well.bottom(z=1), rate=0.3)
-            p20_single.blow_out(dest_well.top(z=-2))
-            
-            # Second 19 µL
-            p20_single.aspirate(19, reservoir_tube.bottom(z=0.5))
-            p20_single.air_gap(0.5)
-            p20_single.dispense(19.5, dest_well.bottom(z=1), rate=0.7)
-            p20_single.blow_out(dest_well.top(z=-2))
+            if VERBOSE:
+                protocol.comment(f"  Transferring 50 µL to destination {row.destination_well}")
             
-            # Final 12 µL
-            p20_single.aspirate(12, reservoir_tube.bottom(z=0.5))
-            p20_single.air_gap(0.5)
-            p20_single.dispense(12.5, dest_well.bottom(z=1))
-            p20_single.blow_out(dest_well.top(z=-2))
+            for transfer_vol, rate in TRANSFER_50:
+                aspirate(transfer_vol, row.reservoir_mix)
+                air_gap(0.5)
+                dispense(transfer_vol + 0.5, row.dest_bottom, rate=rate)
+                blow_out(row.dest_top)
             
             # Drop tip after completing this dilution
-            p20_single.drop_tip()
+            drop_tip()
         
         protocol.comment("Large dilutions complete")
 
@@ -499,189 +523,121 @@ def run(protocol: protocol_api.ProtocolContext):
     # STEP 4: Add samples to normal wells with water volume ≥5 µL
     # ============================================================================
     if wells_water_first:
-        protocol.comment("=" * 60)
-        protocol.comment(f"STEP 3: Adding samples to {len(wells_water_first)} wells (water added first)")
-        protocol.comment("=" * 60)
+        banner(f"STEP 3: Adding samples to {len(wells_water_first)} wells (water added first)")
         
         for row in wells_water_first:
-            source_plate = source_plates[row['source_plate']]
-            destination_plate = destination_plates[row['destination_plate']]
+            dest_well = row.dest_well_obj
             
-            source_well = source_plate[row['source_well']]
-            dest_well = destination_plate[row['destination_well']]
-            
-            sample_vol = row['sample_volume']
-            mix_before_volume = min(row['initial_sample_volume'] * 0.8, 20)
-            final_volume = row['sample_volume'] + row['water_volume']
-            mix_after_volume = min(final_volume * 0.8, 20)
+            sample_vol = row.sample_volume
+            mix_before_volume = row.mix_before_volume
+            mix_after_volume = row.mix_after_volume
 
-            p20_single.pick_up_tip()
+            pick_up_tip()
             
             # Split sample transfer if needed
             if sample_vol > 19:
-                num_transfers = math.ceil(sample_vol / 19)
-                for i in range(num_transfers):
-                    if i == num_transfers - 1:
-                        transfer_vol = sample_vol - (i * 19)
-                    else:
-                        transfer_vol = 19
-                    
+                last_transfer = len(row.transfer_plan) - 1
+                for i, transfer_vol in enumerate(row.transfer_plan):
                     # Mix before only on first transfer
-                    if i == 0:
-                        p20_single.mix(10, mix_before_volume, source_well.bottom(z=0.5))
+                    if i == 0 and row.needs_mix_before:
+                        mix(10, mix_before_volume, row.source_bottom)
                     
-                    p20_single.aspirate(transfer_vol, source_well.bottom(z=0.5))
+                    aspirate(transfer_vol, row.source_bottom)
                     if transfer_vol >= 0.5:
-                        p20_single.air_gap(0.5)
-                        p20_single.dispense(transfer_vol + 0.5, dest_well.bottom(z=1), rate=0.5)
+                        air_gap(0.5)
+                        dispense(transfer_vol + 0.5, row.dest_bottom, rate=0.5)
                     else:
-                        p20_single.dispense(transfer_vol, dest_well.bottom(z=1), rate=0.5)
+                        dispense(transfer_vol, row.dest_bottom, rate=0.5)
                     
                     # Mix after only on last transfer
-                    if i == num_transfers - 1:
-                        p20_single.mix(10, mix_after_volume, dest_well.bottom(z=0.5))
+                    if i == last_transfer:
+                        mix(10, mix_after_volume, row.dest_mix)
                     
-                    p20_single.blow_out(dest_well.bottom(z=2))
-                    p20_single.touch_tip(dest_well, v_offset=-5, speed=10)
-                    p20_single.blow_out(dest_well.top(z=-2))
+                    blow_out(row.dest_blowout)
+                    touch_tip(dest_well, v_offset=-5, speed=10)
+                    blow_out(row.dest_top)
             else:
-                p20_single.mix(10, mix_before_volume, source_well.bottom(z=0.5))
-                p20_single.aspirate(sample_vol, source_well.bottom(z=0.5))
+                if row.needs_mix_before:
+                    mix(10, mix_before_volume, row.source_bottom)
+                aspirate(sample_vol, row.source_bottom)
                 if sample_vol >= 0.5:
-                    p20_single.air_gap(0.5)
-                    p20_single.dispense(sample_vol + 0.5, dest_well.bottom(z=1), rate=0.3)
+                    air_gap(0.5)
+                    dispense(sample_vol + 0.5, row.dest_bottom, rate=0.3)
                 else:
-                    p20_single.dispense(sample_vol, dest_well.bottom(z=1), rate=0.3)
-                p20_single.mix(9, mix_after_volume, dest_well.bottom(z=0.5))
-                p20_single.aspirate(mix_after_volume, dest_well.bottom(z=0.5))
-                p20_single.dispense(mix_after_volume, dest_well.bottom(z=0.5), rate=0.3)
-                p20_single.blow_out(dest_well.bottom(z=2))
-                p20_single.touch_tip(dest_well, v_offset=-5, speed=10)
-                p20_single.blow_out(dest_well.top(z=-2))
+                    dispense(sample_vol, row.dest_bottom, rate=0.3)
+                mix(9, mix_after_volume, row.dest_mix)
+                aspirate(mix_after_volume, row.dest_mix)
+                dispense(mix_after_volume, row.dest_mix, rate=0.3)
+                blow_out(row.dest_blowout)
+                touch_tip(dest_well, v_offset=-5, speed=10)
+                blow_out(row.dest_top)
                 
-            p20_single.drop_tip()
+            drop_tip()
 
     # ============================================================================
     # STEP 5: Add samples FIRST to normal wells with water volume <5 µL
     # ============================================================================
     if wells_water_after:
-        protocol.comment("=" * 60)
-        protocol.comment(f"STEP 4: Adding samples FIRST to {len(wells_water_after)} wells (<5 µL water)")
-        protocol.comment("=" * 60)
+        banner(f"STEP 4: Adding samples FIRST to {len(wells_water_after)} wells (<5 µL water)")
         
         for row in wells_water_after:
-            source_plate = source_plates[row['source_plate']]
-            destination_plate = destination_plates[row['destination_plate']]
+            dest_well = row.dest_well_obj
             
-            source_well = source_plate[row['source_well']]
-            dest_well = destination_plate[row['destination_well']]
-            
-            sample_vol = row['sample_volume']
-            mix_before_volume = min(row['initial_sample_volume'] * 0.8, 20)
+            sample_vol = row.sample_volume
+            mix_before_volume = row.mix_before_volume
 
-            p20_single.pick_up_tip()
+            pick_up_tip()
 
             # Split sample transfer if needed
-            if sample_vol >19:
-                num_transfers = math.ceil(sample_vol / 19)
-                for i in range(num_transfers):
-                    if i == num_transfers - 1:
-                        transfer_vol = sample_vol - (i * 19)
-                    else:
-                        transfer_vol = 19
-                    
+            if sample_vol > 19:
+                last_transfer = len(row.transfer_plan) - 1
+                for i, transfer_vol in enumerate(row.transfer_plan):
                     # Mix before only on first transfer
-                    if i == 0:
-                        p20_single.mix(10, mix_before_volume, source_well.bottom(z=0.5))
+                    if i == 0 and row.needs_mix_before:
+                        mix(10, mix_before_volume, row.source_bottom)
                     
-                    p20_single.aspirate(transfer_vol, source_well.bottom(z=0.5))
+                    aspirate(transfer_vol, row.source_bottom)
                     if transfer_vol >= 0.5:
-                        p20_single.air_gap(0.5)
-                        p20_single.dispense(transfer_vol + 0.5, dest_well.bottom(z=1), rate=0.5)
+                        air_gap(0.5)
+                        dispense(transfer_vol + 0.5, row.dest_bottom, rate=0.5)
                     else:
-                        p20_single.dispense(transfer_vol, dest_well.bottom(z=1), rate=0.5)
-                    p20_single.blow_out(dest_well.bottom(z=2))
-                    p20_single.touch_tip(dest_well, v_offset=-5, speed=10)
-                    p20_single.blow_out(dest_well.top(z=-2))
+                        dispense(transfer_vol, row.dest_bottom, rate=0.5)
+                    blow_out(row.dest_blowout)
+                    touch_tip(dest_well, v_offset=-5, speed=10)
+                    blow_out(row.dest_top)
     
             else:
-                p20_single.mix(10, mix_before_volume, source_well.bottom(z=0.5))
-                p20_single.aspirate(sample_vol, source_well.bottom(z=0.5))
+                if row.needs_mix_before:
+                    mix(10, mix_before_volume, row.source_bottom)
+                aspirate(sample_vol, row.source_bottom)
                 if sample_vol >= 0.5:
-                    p20_single.air_gap(0.5)
-                    p20_single.dispense(sample_vol + 0.5, dest_well.bottom(z=1), rate=0.5)
+                    air_gap(0.5)
+                    dispense(sample_vol + 0.5, row.dest_bottom, rate=0.5)
                 else:
-                    p20_single.dispense(sample_vol, dest_well.bottom(z=1), rate=0.5)
-                p20_single.blow_out(dest_well.bottom(z=2))
-                p20_single.touch_tip(dest_well, v_offset=-5, speed=10)
-                p20_single.blow_out(dest_well.top(z=-2))
+                    dispense(sample_vol, row.dest_bottom, rate=0.5)
+                blow_out(row.dest_blowout)
+                touch_tip(dest_well, v_offset=-5, speed=10)
+                blow_out(row.dest_top)
             
-            p20_single.drop_tip()
+            drop_tip()
 
     # ============================================================================
     # STEP 6: Add water AFTER samples to normal wells with water volume <5 µL
     # ============================================================================
     if wells_water_after:
-        protocol.comment("=" * 60)
-        protocol.comment(f"STEP 5: Adding water AFTER samples to {len(wells_water_after)} wells (<5 µL)")
-        protocol.comment("=" * 60)
+        banner(f"STEP 5: Adding water AFTER samples to {len(wells_water_after)} wells (<5 µL)")
         
-        # Track water usage across multiple water tubes
-        current_water_tube_index = 0
-        water_remaining_in_current_tube = water_per_tube
-
         for row in wells_water_after:
-            destination_plate = destination_plates[row['destination_plate']]
-            dest_well = destination_plate[row['destination_well']]
-            
-            water_vol = row['water_volume']
-            final_volume = row['sample_volume'] + row['water_volume']
-            mix_after_volume = min(final_volume * 0.8, 20)
-            
-            p20_single.pick_up_tip()
+            dest_well = row.dest_well_obj
             
-            water_vol_remaining = water_vol
-            
-            while water_vol_remaining > 0:
-                # Check if we need to switch to next water tube
-                if water_remaining_in_current_tube < 1:
-                    current_water_tube_index += 1
-                    if current_water_tube_index >= num_water_tubes:
-                        raise ValueError("Ran out of water tubes during protocol execution")
-                    water_remaining_in_current_tube = water_per_tube
-                
-                # Determine how much to transfer from current water tube
-                transfer_vol = min(water_vol_remaining, water_remaining_in_current_tube, 19)
-                
-                current_water_well = water_wells[current_water_tube_index]
-                
-                p20_single.aspirate(transfer_vol, current_water_well)
-                if transfer_vol >= 0.5:
-                    p20_single.air_gap(0.5)
-                    p20_single.dispense(transfer_vol + 0.5, dest_well.bottom(z=1))
-                else:
-                    p20_single.dispense(transfer_vol, dest_well.bottom(z=1))
-                
-                # Mix after only on last transfer
-                if water_vol_remaining - transfer_vol <= 0:
-                    p20_single.mix(9, mix_after_volume, dest_well.bottom(z=0.5))
-                    p20_single.aspirate(mix_after_volume, dest_well.bottom(z=1))
-                    p20_single.dispense(mix_after_volume, dest_well.bottom(z=1), rate=0.5)
-                
-                p20_single.blow_out(dest_well.bottom(z=2))
-                p20_single.touch_tip(dest_well, v_offset=-5, speed=10)
-                p20_single.blow_out(dest_well.top(z=-2))
-                
-                water_vol_remaining -= transfer_vol
-                water_remaining_in_current_tube -= transfer_vol
-
-            p20_single.drop_tip()
+            pick_up_tip()
+            dispense_water(dest_well, row.water_transfers, 1.0, mix_after_volume=row.mix_after_volume)
+            drop_tip()
 
     # ============================================================================
     # PROTOCOL COMPLETE
     # ============================================================================
-    protocol.comment("=" * 60)
-    protocol.comment("PROTOCOL COMPLETE!")
+    banner("PROTOCOL COMPLETE!")
     protocol.comment(f"Total transfers: {len(well_data)}")
     protocol.comment(f"  - Normal dilutions (water first): {len(wells_water_first)}")
     protocol.comment(f"  - Normal dilutions (water after): {len(wells_water_after)}")
@@ -690,4 +646,3 @@ def run(protocol: protocol_api.ProtocolContext):
         protocol.comment(f"  - Reservoir tubes used: {len(wells_large_dilution)}")
     protocol.comment(f"Water tubes used: {num_water_tubes}")
     protocol.comment(f"Total reservoir tubes used: {total_tubes_needed}")
-    protocol.comment("=" * 60)
@@ -1,9 +1,10 @@
 from opentrons import protocol_api
+from operator import itemgetter
 
 metadata = {
-    'protocolName': 'Basic Aliquoting with CSV Parameter - Largest to Smallest',
+    'protocolName': 'Basic Aliquoting with CSV Parameter - Full Columns, then Largest to Smallest',
     'author': 'OpentronsAI',
-    'description': 'Transfer samples from PCR plate to pooling tube based on uploaded CSV data, sorted from largest to smallest volume',
+    'description': 'Transfer samples from PCR plate to pooling tube based on uploaded CSV data. Full plate columns at one volume go first via an 8-tube strip (multichannel), then the remaining wells from largest to smallest volume',
     'source': 'OpentronsAI'
 }
 
@@ -18,31 +19,82 @@ def add_parameters(parameters):
         display_name="Transfer CSV File",
         description="CSV file with Well and Volume columns for sample transfers"
     )
+    
+    parameters.add_bool(
+        variable_name="reuse_tip",
+        display_name="Reuse Tip",
+        description="Keep one tip for all wells going to the pool (off: fresh tip per well)",
+        default=False
+    )
 
 def run(protocol: protocol_api.ProtocolContext):
     # Access the uploaded CSV file
     csv_file = protocol.params.transfer_csv
+    reuse_tip = protocol.params.reuse_tip
     
     # Parse the CSV data
     csv_data = csv_file.parse_as_csv()
     
-    # Skip header row and get transfer data
-    transfer_data = list(csv_data)[1:]  # Skip header row
+    # Stream the rows once: skip the header, convert each volume as it is read
+    csv_rows = iter(csv_data)
+    next(csv_rows, None)  # Skip header row
+    transfer_data = [(row[0], float(row[1])) for row in csv_rows]
+    
+    # Sort transfer data by volume (largest to smallest); stable, so ties keep file order
+    transfer_data.sort(key=itemgetter(1), reverse=True)
+    
+    # Group rows by plate column (well 'B7' -> column '7')
+    columns = {}
+    for well_name, volume in transfer_data:
+        columns.setdefault(well_name[1:], []).append((well_name[0], volume))
     
-    # Sort transfer data by volume (largest to smallest)
-    transfer_data.sort(key=lambda row: float(row[1]), reverse=True)
+    # Full columns at a single volume go with the multichannel, everything else single-channel
+    multi_columns = []  # (column, volume)
+    single_rows = []  # (well, volume), still largest to smallest
+    for col, rows in columns.items():
+        volumes = set(volume for _, volume in rows)
+        if sorted(row_letter for row_letter, _ in rows) == list('ABCDEFGH') and len(volumes) == 1:
+            multi_columns.append((col, volumes.pop()))
+        else:
+            single_rows.extend((row_letter + col, volume) for row_letter, volume in rows)
+    single_rows.sort(key=lambda row: row[1], reverse=True)
     
     # Load labware
     source_plate = protocol.load_labware('opentrons_96_wellplate_200ul_pcr_full_skirt', 1)
     tube_block = protocol.load_labware('opentrons_24_aluminumblock_nest_2ml_screwcap', 2)
     tiprack = protocol.load_labware('opentrons_96_filtertiprack_20ul', 3)
     
-    # Load pipette
+    # Load pipettes
     p20 = protocol.load_instrument('p20_single_gen2', 'right', tip_racks=[tiprack])
     
+    # Strip block, multichannel and its tips are only needed when the CSV has full columns
+    if multi_columns:
+        strip_block = protocol.load_labware('opentrons_96_aluminumblock_generic_pcr_strip_200ul', 5)
+        multi_tiprack = protocol.load_labware('opentrons_96_filtertiprack_20ul', 6)
+        p20_multi = protocol.load_instrument('p20_multi_gen2', 'left', tip_racks=[multi_tiprack])
+        
+        # 8-tube strips (one per strip block column) collect whole plate columns before pooling
+        STRIP_TUBE_CAPACITY = 200  # µL
+        STRIP_DEAD_VOLUME = 3  # µL left in each strip tube after emptying (wall film + below the tip); measure for your strips
+        strip_columns = strip_block.columns()
+        
+        # Plan the strips up front so each tube can be over-filled by its dead volume
+        strip_plan = [[]]  # (column, volume) per strip tube
+        strip_volumes = [0]  # Volume each strip tube hands on to the pool
+        for col, volume in multi_columns:
+            if strip_plan[-1] and strip_volumes[-1] + volume + STRIP_DEAD_VOLUME > STRIP_TUBE_CAPACITY:
+                strip_plan.append([])
+                strip_volumes.append(0)
+            strip_plan[-1].append((col, volume))
+            strip_volumes[-1] += volume
+    
     # Define pooling tube (using first position in tube block)
     pooling_tube = tube_block['A1']
     
+    # A reused tip dispenses above the liquid so it never carries pool back into later sources;
+    # a fresh tip dispenses at the default clearance
+    pool_dest = pooling_tube.top(-2) if reuse_tip else pooling_tube
+    
     # Define liquid for visualization
     sample_liquid = protocol.define_liquid(
         name="Sample",
@@ -50,33 +102,88 @@ def run(protocol: protocol_api.ProtocolContext):
         display_color="#FF0000"
     )
     
-    # Load liquid into source wells (for visualization)
-    for row in transfer_data:
-        well_name = row[0]  # First column should be Well
-        source_plate[well_name].load_liquid(liquid=sample_liquid, volume=20)
+    # One summary instead of a comment per transfer
+    if transfer_data:
+        protocol.comment(
+            f"Transferring {len(transfer_data)} wells, {transfer_data[0][1]}-{transfer_data[-1][1]} µL: "
+            f"{len(multi_columns)} full columns by multichannel first, then {len(single_rows)} wells by single-channel largest to smallest"
+        )
+    
+    # Transfer full columns into the strip with one multichannel motion per column.
+    # Every column in a tube is scaled up by the same factor, so the tube holds its pool volume plus
+    # the dead volume in the same proportions and each column reaches the pool at its CSV volume.
+    if reuse_tip and multi_columns:
+        p20_multi.pick_up_tip()
+    for strip, planned, pool_volume in zip(strip_columns, strip_plan, strip_volumes) if multi_columns else ():
+        scale = (pool_volume + STRIP_DEAD_VOLUME) / pool_volume
+        for col, volume in planned:
+            
+            # Load liquid into source wells (for visualization) as each column is reached
+            column_wells = source_plate.columns_by_name()[col]
+            for well in column_wells:
+                well.load_liquid(liquid=sample_liquid, volume=20)
+            well = column_wells[0]
+            
+            if not reuse_tip:
+                p20_multi.pick_up_tip()
+            p20_multi.mix(3, 15, well)
+            p20_multi.transfer(
+                volume * scale,
+                well,
+                strip[0].top(-2) if reuse_tip else strip[0],
+                new_tip='never'  # Already have tip
+            )
+            # Blow out every column so nothing is left in the tip; the strip then holds the full volume
+            p20_multi.blow_out(strip[0].top(-2))
+            if not reuse_tip:
+                p20_multi.drop_tip()
+    if multi_columns and p20_multi.has_tip:
+        p20_multi.drop_tip()
     
-    # Perform transfers based on sorted CSV data (largest to smallest volume)
-    for row in transfer_data:
-        well_name = row[0]  # First column: Well position
-        volume = float(row[1])  # Second column: Volume
+    # With reuse_tip the p20 keeps one tip for the strip and every remaining well
+    if reuse_tip and (multi_columns or single_rows):
+        p20.pick_up_tip()
+    
+    # Move each strip tube's pool volume into the pooling tube (one tip, everything ends up in the pool).
+    # The over-fill stays behind as the tube's dead volume. The tip goes back into later strip tubes,
+    # so it always dispenses above the pool liquid.
+    if multi_columns:
+        if not reuse_tip:
+            p20.pick_up_tip()
+        for strip, volume in zip(strip_columns, strip_volumes):
+            p20.transfer(volume, strip, pooling_tube.top(-2), new_tip='never',
+                         blow_out=True, blowout_location='destination well')
+        if not reuse_tip:
+            p20.drop_tip()
+    
+    # Perform single-channel transfers for the remaining wells (largest to smallest volume)
+    for well_name, volume in single_rows:
         
-        protocol.comment(f"Transferring {volume} µL from well {well_name}")
+        # Load liquid into source well (for visualization)
+        well = source_plate[well_name]
+        well.load_liquid(liquid=sample_liquid, volume=20)
         
         # Pick up tip
-        p20.pick_up_tip()
+        if not reuse_tip:
+            p20.pick_up_tip()
         
         # Mix sample briefly (3 times with 15 µL)
-        p20.mix(3, 15, source_plate[well_name])
+        p20.mix(3, 15, well)
         
         # Transfer specified volume to pooling tube
         p20.transfer(
             volume,
-            source_plate[well_name],
-            pooling_tube,
+            well,
+            pool_dest,
             new_tip='never'  # Already have tip
         )
         
-        # Drop tip
+        # Clear the tip over the pool when it is reused, otherwise drop it
+        if reuse_tip:
+            p20.blow_out(pooling_tube.top(-2))
+        else:
+            p20.drop_tip()
+    if p20.has_tip:
         p20.drop_tip()
     
-    protocol.comment(f"Protocol completed. Transferred samples from {len(transfer_data)} wells to pooling tube in order from largest to smallest volume.")
+    protocol.comment(f"Protocol completed. Transferred samples from {len(transfer_data)} wells to pooling tube: full columns first, then the remaining wells from largest to smallest volume.")